@@ -15,6 +15,10 @@ EOF = "_EOF"
 MAX_USHORT = 0xFFFF
 PCL_HEADER_SIZE = 20
 
+# Buffer size for files written in many small pieces (parcel + pad, chunks).
+# Parcels are up to 64K each, so 1 MiB lets a dozen or more share one write().
+WRITE_BUFFER_SIZE = 1024 * 1024
+
 # Compression Flags
 NO_COMPRESSION = 0
 SZIP_COMPRESSION = 4
@@ -1,7 +1,9 @@
-import io
 import struct
-from typing import List, Tuple, Optional
-from .routing_format import deg_to_ntu 
+from typing import Tuple, Optional, Sequence, Union
+
+import numpy as np
+
+from .routing_format import deg_to_ntu_arr
 
 # Импортируем всё из constants, чтобы encoder видел MAX_USHORT и PIDs
 from .constants import (
@@ -22,22 +24,22 @@ _PCL_STRUCT = struct.Struct(">I H B B B B H H H H H")
 # Parcel Encoding
 # ────────────────────────────────────────────────────────────────
 
-def encode_bytes(
+def encode_parcel_header(
     pid: int,
-    payload: bytes,
+    payload_len: int,
     *,
     region: int = 1,
     parcel_type: int = 0,
-    parcel_desc: int = 0, 
+    parcel_desc: int = 0,
     offset_units: Optional[int] = None,
     compress_type: int = NO_COMPRESSION,
     size_index: int = 0,
     external_to_region: bool = False,
     redundancy: bool = False,
-    block_size: int = 4096,
 ) -> bytes:
     """
-    Encodes a payload into a full SDAL parcel (PclHdr_t + data).
+    Encodes the PclHdr_t for a payload of *payload_len* bytes, so callers can
+    write header and payload to a file without concatenating them.
     """
     if offset_units is None:
         offset_units = 0
@@ -50,8 +52,6 @@ def encode_bytes(
     else:
         final_pid = pid
 
-    payload_len = len(payload)
-    
     # Сжатие не используется (NO_COMPRESSION), поэтому размеры равны
     cmp_size_hi = 0
     cmp_size_lo = 0
@@ -68,7 +68,7 @@ def encode_bytes(
     us_cmp_data_uncomp_size = total_uncompressed_size if total_uncompressed_size <= MAX_USHORT else MAX_USHORT
     
     # Упаковка заголовка
-    header = _PCL_STRUCT.pack(
+    return _PCL_STRUCT.pack(
         final_pid,                  # ParcelID
         parcel_desc,                # ParcelDesc
         parcel_type,                # ParcelType
@@ -82,12 +82,37 @@ def encode_bytes(
         0                           # Extension Offset
     )
 
+
+def encode_bytes(
+    pid: int,
+    payload: bytes,
+    *,
+    region: int = 1,
+    parcel_type: int = 0,
+    parcel_desc: int = 0, 
+    offset_units: Optional[int] = None,
+    compress_type: int = NO_COMPRESSION,
+    size_index: int = 0,
+    external_to_region: bool = False,
+    redundancy: bool = False,
+    block_size: int = 4096,
+) -> bytes:
+    """
+    Encodes a payload into a full SDAL parcel (PclHdr_t + data).
+    """
+    header = encode_parcel_header(
+        pid, len(payload),
+        region=region, parcel_type=parcel_type, parcel_desc=parcel_desc,
+        offset_units=offset_units, compress_type=compress_type,
+        size_index=size_index, external_to_region=external_to_region,
+        redundancy=redundancy,
+    )
     return header + payload
 
 
 def encode_strings(
     pid: int,
-    strings: List[str],
+    strings: Sequence[Union[str, bytes]],
     *,
     compress_type: int = NO_COMPRESSION, 
     region: int = 1,
@@ -99,29 +124,35 @@ def encode_strings(
     redundancy: bool = False,
     block_size: int = 4096,
 ) -> bytes:
-    """Encodes a list of strings into a single parcel with offsets table."""
-    string_buffer = io.BytesIO()
-    for s in strings:
-        s_bytes = s.encode('ascii', 'replace') + b'\x00'
-        string_buffer.write(s_bytes)
-    string_data = string_buffer.getvalue()
-    
-    offsets_table_buffer = io.BytesIO()
-    offsets_table_buffer.write(struct.pack(">I", len(strings)))
-    
+    """
+    Encodes a list of strings into a single parcel with offsets table.
+    Items may already be ASCII-encoded bytes; each item is encoded only once.
+    """
+    encoded = [s if isinstance(s, bytes) else s.encode('ascii', 'replace') for s in strings]
+    string_data = b'\x00'.join(encoded) + b'\x00' if encoded else b''
+
+    offsets = []
     current_string_offset = 0
-    for s in strings:
-        offsets_table_buffer.write(struct.pack(">I", current_string_offset))
-        current_string_offset += len(s.encode('ascii', 'replace') + b'\x00')
+    for s_bytes in encoded:
+        offsets.append(current_string_offset)
+        current_string_offset += len(s_bytes) + 1
 
-    payload = offsets_table_buffer.getvalue() + string_data
+    offsets_table = struct.pack(f">I{len(offsets)}I", len(offsets), *offsets)
+    payload = offsets_table + string_data
 
     return encode_bytes(pid, payload, compress_type=compress_type, region=region, parcel_type=parcel_type, parcel_desc=parcel_desc, offset_units=offset_units)
 
 
+# Cartography record header: way id + vertex count; vertices follow as >ii (lon, lat)
+_CARTO_RECORD_HEADER_DTYPE = np.dtype([("way_id", ">u4"), ("count", ">u2")])
+CARTO_HEADER_SIZE = 18
+
+
 def encode_cartography(
     pid: int,
-    records: List[Tuple[int, List[Tuple[float, float]]]],
+    way_ids: np.ndarray,
+    coord_counts: np.ndarray,
+    coords: np.ndarray,
     *,
     compress_type: int = NO_COMPRESSION,
     region: int = 1,
@@ -131,21 +162,54 @@ def encode_cartography(
     rect_ntu: Tuple[int, int, int, int] = (0, 0, 0, 0),
     **kwargs
 ) -> bytes:
-    """Encodes a Cartography Parcel (PID 110)."""
-    buf = io.BytesIO()
-    buf.write(struct.pack(">iiiiH", rect_ntu[2], rect_ntu[0], rect_ntu[3], rect_ntu[1], len(records)))
-    for way_id, coords in records:
-        buf.write(struct.pack(">I", way_id))
-        buf.write(struct.pack(">H", len(coords)))
-        for lon, lat in coords:
-            lat_ntu, lon_ntu = deg_to_ntu(lat, lon)
-            buf.write(struct.pack(">ii", lon_ntu, lat_ntu))
-    return encode_bytes(pid, buf.getvalue(), compress_type=compress_type, region=region, parcel_type=parcel_type, parcel_desc=parcel_desc, offset_units=offset_units)
+    """
+    Encodes a Cartography Parcel (PID 110).
+
+    Records are given as parallel arrays: way_ids[i] has coord_counts[i]
+    vertices, stored consecutively in *coords* as [lon, lat] rows.
+    """
+    way_ids = np.asarray(way_ids)
+    coord_counts = np.asarray(coord_counts, dtype=np.int64)
+    n = len(way_ids)
+    # The >u4 / >u2 record fields would wrap silently; reject what does not fit
+    if n and (way_ids.min() < 0 or way_ids.max() > 0xFFFFFFFF):
+        raise ValueError("Cartography way ids must be 0 to 0xFFFFFFFF.")
+    if n and (coord_counts.min() < 0 or coord_counts.max() > 0xFFFF):
+        raise ValueError("Cartography records must have 0 to 65535 vertices.")
+
+    record_sizes = 6 + coord_counts * 8
+    record_starts = CARTO_HEADER_SIZE + np.cumsum(record_sizes) - record_sizes
+    out = np.zeros(CARTO_HEADER_SIZE + int(record_sizes.sum()), dtype=np.uint8)
+    struct.pack_into(">iiiiH", out, 0, rect_ntu[2], rect_ntu[0], rect_ntu[3], rect_ntu[1], n)
+
+    headers = np.empty(n, dtype=_CARTO_RECORD_HEADER_DTYPE)
+    headers["way_id"] = way_ids
+    headers["count"] = coord_counts
+    out[record_starts[:, None] + np.arange(6)] = headers.view(np.uint8).reshape(n, 6)
+
+    if len(coords):
+        lat_ntu, lon_ntu = deg_to_ntu_arr(coords[:, 1], coords[:, 0])
+        vertices = np.empty((len(coords), 2), dtype=">i4")
+        vertices[:, 0] = lon_ntu
+        vertices[:, 1] = lat_ntu
+
+        # Byte position of every vertex: its record's data start + 8 * rank within the record
+        first_vertex = np.cumsum(coord_counts) - coord_counts
+        rank = np.arange(len(coords)) - np.repeat(first_vertex, coord_counts)
+        vertex_pos = np.repeat(record_starts + 6, coord_counts) + rank * 8
+        out[vertex_pos[:, None] + np.arange(8)] = vertices.view(np.uint8).reshape(-1, 8)
+
+    return encode_bytes(pid, out.tobytes(), compress_type=compress_type, region=region, parcel_type=parcel_type, parcel_desc=parcel_desc, offset_units=offset_units)
+
+
+# B-tree / POI index entry: key id + 64-bit offset
+_BTREE_ENTRY_DTYPE = np.dtype([("id", ">u4"), ("offset", ">u8")])
 
 
 def encode_btree(
     pid: int,
-    offsets: List[Tuple[int, int]],
+    ids: np.ndarray,
+    offsets: np.ndarray,
     *,
     compress_type: int = NO_COMPRESSION,
     region: int = 1,
@@ -154,13 +218,13 @@ def encode_btree(
     offset_units: Optional[int] = None,
     **kwargs
 ) -> bytes:
-    """Encodes a B-tree or POI index parcel."""
-    buf = io.BytesIO()
-    buf.write(struct.pack(">IH", len(offsets), 1))
-    for id_val, offset_val in offsets:
-        buf.write(struct.pack(">IQ", id_val, offset_val))
-    return encode_bytes(pid, buf.getvalue(), compress_type=compress_type, region=region, parcel_type=parcel_type, parcel_desc=parcel_desc, offset_units=offset_units)
+    """Encodes a B-tree or POI index parcel from parallel id / offset arrays."""
+    entries = np.empty(len(ids), dtype=_BTREE_ENTRY_DTYPE)
+    entries["id"] = ids
+    entries["offset"] = offsets
+    payload = struct.pack(">IH", len(entries), 1) + entries.tobytes()
+    return encode_bytes(pid, payload, compress_type=compress_type, region=region, parcel_type=parcel_type, parcel_desc=parcel_desc, offset_units=offset_units)
 
 
-def encode_poi_index(pid: int, offsets: List[Tuple[int, int]], **kwargs) -> bytes:
-    return encode_btree(pid, offsets, **kwargs)
\ No newline at end of file
+def encode_poi_index(pid: int, ids: np.ndarray, offsets: np.ndarray, **kwargs) -> bytes:
+    return encode_btree(pid, ids, offsets, **kwargs)
@@ -12,6 +12,7 @@ from tqdm import tqdm
 import requests
 import os
 
+from .constants import WRITE_BUFFER_SIZE
 from .sdal_osmium_stream import extract_driving_roads   # road helper
 
 LOG = logging.getLogger(__name__)
@@ -114,7 +115,7 @@ def download_region_if_needed(region: str, work_dir: Path) -> Path:
         r.raise_for_status()
         total = int(r.headers.get("content-length", 0)) or None
 
-        with open(dest, "wb") as f, tqdm(
+        with open(dest, "wb", buffering=WRITE_BUFFER_SIZE) as f, tqdm(
             total=total,
             unit="B",
             unit_scale=True,
@@ -5,6 +5,8 @@ import pathlib
 import os
 from tqdm import tqdm
 
+from .constants import WRITE_BUFFER_SIZE
+
 class TqdmFileWrapper:
     """
     Обертка для файла, которая обновляет tqdm при записи.
@@ -13,7 +15,7 @@ class TqdmFileWrapper:
     def __init__(self, path, total_size, desc="Writing ISO"):
         self.path = path
         self.total_size = total_size
-        self.fp = open(path, "wb")
+        self.fp = open(path, "wb", buffering=WRITE_BUFFER_SIZE)
         self.pbar = tqdm(total=total_size, unit="B", unit_scale=True, desc=desc, leave=True)
 
     def write(self, data):
@@ -28,17 +28,18 @@ import pathlib
 import warnings
 import shutil
 from logging.handlers import RotatingFileHandler
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
 from dataclasses import dataclass
+from functools import lru_cache, partial
 from typing import Callable, Any, List, Tuple
 
 import numpy as np
 import geopandas as gpd
-from shapely.geometry import LineString, MultiLineString, box, Point
+import shapely
 from tqdm import tqdm
 import struct
 import zlib
 import os
-import math
 
 sys.stderr.write(f"Done in {time.time() - _t_start:.1f}s\n")
 sys.stderr.flush()
@@ -51,7 +52,8 @@ from .constants import (
     PIDS_OEM, PIDS_STD,
     MAX_USHORT, NO_COMPRESSION, UNCOMPRESSED_FLAG,
     PSF_VERSION_MAJOR, PSF_VERSION_MINOR, PSF_VERSION_YEAR,
-    MARKER_TABLE, CONTINENT_MAP, HUFFMAN_TABLE
+    MARKER_TABLE, CONTINENT_MAP, HUFFMAN_TABLE,
+    WRITE_BUFFER_SIZE,
 )
 
 try:
@@ -67,14 +69,18 @@ from .etl import (
 )
 from .encoder import (
     encode_bytes,
+    encode_parcel_header,
     encode_strings,
     encode_cartography,
     encode_btree,
+    CARTO_HEADER_SIZE,
     encode_poi_index
 )
 from .iso import build_iso
 from .translations import countries
-from .routing_format import NodeRecord, SegmentRecord, deg_to_ntu, encode_routing_parcel
+from .routing_format import (
+    NodeTable, SegmentTable, deg_to_ntu, encode_routing_parcel, segments_by_from_node,
+)
 from .spatial import build_kdtree, serialize_kdtree
 
 log = logging.getLogger(__name__)
@@ -124,6 +130,36 @@ def safe_encode_parcel(pid, payload, offset_units, compress_type=NO_COMPRESSION)
         )
     return encode_bytes(pid, payload, offset_units=offset_units, compress_type=compress_type)
 
+
+def write_parcel(f, pid: int, *parts, offset_units: int = 0,
+                 compress_type: int = NO_COMPRESSION) -> int:
+    """
+    Streams one parcel to *f*: the PclHdr_t, then the payload *parts* as they
+    are (bytes or memoryviews), with the same 64K check as safe_encode_parcel.
+    Returns the number of bytes written.
+    """
+    payload_len = sum(len(p) for p in parts)
+    if payload_len > MAX_PARCEL_PAYLOAD:
+        raise ValueError(
+            f"CRITICAL ERROR: Parcel PID {pid} payload size {payload_len} "
+            f"exceeds SDAL limit {MAX_PARCEL_PAYLOAD} bytes! Must chunk data."
+        )
+    header = encode_parcel_header(pid, payload_len, offset_units=offset_units,
+                                  compress_type=compress_type)
+    f.write(header)
+    for part in parts:
+        f.write(part)
+    return len(header) + payload_len
+
+
+def align_up(n: int, unit_size: int = 4096) -> int:
+    """Rounds *n* up to the next multiple of *unit_size* (a power of two)."""
+    return (n + unit_size - 1) & ~(unit_size - 1)
+
+
+# Shared zero block; parcel padding is written as a view of it.
+_ZERO_UNIT = memoryview(bytes(4096))
+
 # ============================================================================
 # HEADER ENCODERS (STANDARD 0.SDL / SDAL MODE)
 # ============================================================================
@@ -156,13 +192,17 @@ def encode_glb_media_header(pids, sdl_files, regions, supp_langs, offset_locale,
 
 
 def encode_locale_table(countries_dict, supported_langs) -> bytes:
-    buf = bytearray()
     all_countries = sorted(countries_dict.keys())
-    buf += struct.pack(">II", len(all_countries), len(supported_langs) + 1)
-
     lang_codes = [b"NATIVE"] + [lang.encode('ascii') for lang in supported_langs]
+
+    # Буфер уже заполнен нулями: поля просто обрезаются и копируются на место
+    buf = bytearray(8 + 8 * len(lang_codes) + 32 * len(all_countries) * len(lang_codes))
+    struct.pack_into(">II", buf, 0, len(all_countries), len(lang_codes))
+    off = 8
     for code in lang_codes:
-        buf += code[:8].ljust(8, b'\x00')
+        field = code[:8]
+        buf[off:off + len(field)] = field
+        off += 8
 
     for country in all_countries:
         row = [country]
@@ -170,7 +210,9 @@ def encode_locale_table(countries_dict, supported_langs) -> bytes:
         for lang in supported_langs:
             row.append(t.get(lang, t.get("UKE", country)))
         for name in row:
-            buf += name.encode('ascii', 'replace')[:32].ljust(32, b'\x00')
+            field = name.encode('ascii', 'replace')[:32]
+            buf[off:off + len(field)] = field
+            off += 32
     return bytes(buf)
 
 
@@ -208,26 +250,22 @@ def build_region_sdl_file(mode, out_path, db_id, sdl_name,
     unit_size = 1 << unit_shift
     offset_bytes = 0
 
-    with open(out_path, "wb") as f:
+    with open(out_path, "wb", buffering=WRITE_BUFFER_SIZE) as f:
         if mode.upper() == "SDAL":
             rh = _encode_region_header(db_id, pids)
             f.write(rh)
-            pad = (-len(rh)) & (unit_size - 1)
-            if pad:
-                f.write(b'\x00' * pad)
-            offset_bytes += len(rh) + pad
+            aligned = align_up(len(rh), unit_size)
+            f.write(_ZERO_UNIT[:aligned - len(rh)])
+            offset_bytes += aligned
 
         for pb in parcel_builders:
             offset_units = offset_bytes >> unit_shift
-            parcel_bytes = pb.make(offset_units)
-
-            parcel_with_header = safe_encode_parcel(pb.pid, parcel_bytes, offset_units)
-            f.write(parcel_with_header)
+            written = write_parcel(f, pb.pid, pb.make(offset_units),
+                                   offset_units=offset_units)
 
-            pad = (-len(parcel_with_header)) & (unit_size - 1)
-            if pad:
-                f.write(b"\x00" * pad)
-            offset_bytes += len(parcel_with_header) + pad
+            aligned = align_up(written, unit_size)
+            f.write(_ZERO_UNIT[:aligned - written])
+            offset_bytes += aligned
 
             topology_entries.append(
                 TopologyEntry(
@@ -265,36 +303,55 @@ def write_init_sdl_standard(dst_path, sdl_files, regions, supp_lang, pids):
     payload_symbol = encode_symbol_table(HUFFMAN_TABLE)
 
     ph_size = 532
-    pad1 = (-ph_size) & (unit_size - 1)
-    off_locale = (ph_size + pad1) // unit_size
+    off_locale = align_up(ph_size, unit_size) // unit_size
     loc_size = len(payload_locale)
     off_comp = off_locale + ((loc_size + 20) // unit_size)
 
     payload_header = encode_glb_media_header(pids, sdl_files, regions, supp_langs, off_locale, off_comp)
 
+    # GLB_MEDIA_HEADER
+    ph = safe_encode_parcel(pids.GLB_MEDIA_HEADER, payload_header, 0)
+    offset_bytes += align_up(len(ph), unit_size)
+
+    # LOCALE
+    pl = safe_encode_parcel(pids.LOCALE, payload_locale, offset_bytes >> unit_shift)
+    offset_bytes += align_up(len(pl), unit_size)
+
+    # SYMBOL TABLE
+    ps = safe_encode_parcel(pids.SYMBOL, payload_symbol, offset_bytes >> unit_shift)
+    offset_bytes += align_up(len(ps), unit_size)
+
+    # One zero-filled buffer holds all parcels at their aligned offsets,
+    # so the padding comes for free and the file is written in one call.
+    out = bytearray(offset_bytes)
+    pos = 0
+    for parcel in (ph, pl, ps):
+        out[pos:pos + len(parcel)] = parcel
+        pos += align_up(len(parcel), unit_size)
+
     with open(dst_path, "wb") as f:
-        # GLB_MEDIA_HEADER
-        ph = safe_encode_parcel(pids.GLB_MEDIA_HEADER, payload_header, 0)
-        f.write(ph)
-        pad = (-len(ph)) & (unit_size - 1)
-        if pad:
-            f.write(b"\x00" * pad)
-        offset_bytes += len(ph) + pad
-
-        # LOCALE
-        pl = safe_encode_parcel(pids.LOCALE, payload_locale, offset_bytes >> unit_shift)
-        f.write(pl)
-        pad = (-len(pl)) & (unit_size - 1)
-        if pad:
-            f.write(b"\x00" * pad)
-        offset_bytes += len(pl) + pad
-
-        # SYMBOL TABLE
-        ps = safe_encode_parcel(pids.SYMBOL, payload_symbol, offset_bytes >> unit_shift)
-        f.write(ps)
-        pad = (-len(ps)) & (unit_size - 1)
-        if pad:
-            f.write(b"\x00" * pad)
+        f.write(out)
+
+
+# INIT.SDL (OEM) record layouts: HEADER_T codec and packed little-endian
+# dtypes for the COUNTRY_REF_T, FEATURE_SET_T and COUNTRY_INFO_T tables.
+_OEM_INIT_HEADER_STRUCT = struct.Struct("<IIIIIII12s")
+_OEM_COUNTRY_REF_DTYPE = np.dtype([
+    ("country_id", "<u2"), ("code", "S5"), ("chain_flags", "u1"),
+    ("affix_offset", "<u4"), ("feature_offset", "<u4"),
+    ("media_profile_id", "<u2"), ("checksum", "<u2"), ("padding", "V12"),
+])
+_OEM_FEATURE_SET_DTYPE = np.dtype([
+    ("region_code", "<u2"), ("language_code", "<u2"),
+    ("bitmask1", "<u4"), ("bitmask2", "<u4"), ("bitmask3", "<u4"),
+    ("model_trim_id", "<u4"),
+])
+_OEM_COUNTRY_INFO_DTYPE = np.dtype([
+    ("country_id", "<u2"), ("phone_code", "<u2"), ("lang_code", "u1"),
+    ("driving_side", "u1"), ("measurement_system", "u1"), ("currency_type", "u1"),
+    ("voice_lang", "S3"), ("voice_female", "S4"), ("voice_male", "S4"),
+    ("reserved", "V13"),
+])
 
 
 def write_oem_init_sdl(
@@ -369,9 +426,9 @@ def write_oem_init_sdl(
 
     BLOCK_SIZE = 0x12048
     HEADER_SIZE = 0x100
-    COUNTRY_REF_SIZE = 32
-    FEATURE_SET_SIZE = 20
-    COUNTRY_INFO_SIZE = 32
+    COUNTRY_REF_SIZE = _OEM_COUNTRY_REF_DTYPE.itemsize     # 32
+    FEATURE_SET_SIZE = _OEM_FEATURE_SET_DTYPE.itemsize     # 20
+    COUNTRY_INFO_SIZE = _OEM_COUNTRY_INFO_DTYPE.itemsize   # 32
 
     # Build quick lookup of actually generated SDL filenames (upper-case).
     generated_names = {p.name.upper() for p in generated_files}
@@ -481,9 +538,9 @@ def write_oem_init_sdl(
         version = 0x00010000
         total_size = BLOCK_SIZE
         struct.pack_into("<III", buf, 0x00, magic, version, total_size)
-        crc = zlib.crc32(buf[0x10:], 0xFFFFFFFF) ^ 0xFFFFFFFF
+        crc = zlib.crc32(memoryview(buf)[0x10:], 0xFFFFFFFF) ^ 0xFFFFFFFF
         struct.pack_into("<I", buf, 0x0C, crc & 0xFFFFFFFF)
-        dst_path.write_bytes(bytes(buf))
+        dst_path.write_bytes(buf)
         return
 
     country_count = len(country_entries)
@@ -503,8 +560,7 @@ def write_oem_init_sdl(
     crc_placeholder = 0
 
     # HEADER_T
-    struct.pack_into(
-        "<IIIIIII12s",
+    _OEM_INIT_HEADER_STRUCT.pack_into(
         buf,
         0x00,
         magic,
@@ -517,86 +573,62 @@ def write_oem_init_sdl(
         b"\x00" * 12,
     )
 
-    # COUNTRY_REF_T, FEATURE_SET_T and COUNTRY_INFO_T struct codecs
-    country_ref_struct = struct.Struct("<H5sBIIHH12s")
-    feature_struct = struct.Struct("<HHIIII")
-    country_info_struct = struct.Struct("<HHBBBB3s4s4s13s")
-
-    # Fill arrays in parallel: REF → FEATURE → COUNTRY_INFO
-    for idx, entry in enumerate(country_entries):
-        cid = entry["id"]
-        feature_offset = offset_feature_sets + idx * FEATURE_SET_SIZE
-        info_offset = offset_country_infos + idx * COUNTRY_INFO_SIZE
-
-        lang_index = lang_index_map.get(entry["voice_lang"], 0)
-
-        # --- FEATURE_SET_T ----------------------------------------------------
-        feature_struct.pack_into(
-            buf,
-            feature_offset,
-            cid,             # default region code (we use country id)
-            lang_index,      # default language code
-            0x00000001,      # feature bitmask 1: basic navigation enabled
-            0,               # feature bitmask 2
-            0,               # feature bitmask 3
-            0,               # model/trim ID
-        )
-
-        # --- COUNTRY_INFO_T (simplified GlbCountry_t analogue) ---------------
-        name_key = entry["name"].upper()
-        phone_code = phone_codes.get(name_key, 0)
-        driving_side = 1 if name_key in left_hand_countries else 0
-        meas_system = 0  # metric for Europe
-        currency_type = 0  # unknown / default
-
-        voice_lang_bytes = entry["voice_lang"].encode("ascii", "replace")[:3].ljust(3, b"\x00")
-        female_tag = entry["voice_female_tag"][:4].ljust(4, b"\x00")
-        male_tag = entry["voice_male_tag"][:4].ljust(4, b"\x00")
-
-        country_info_struct.pack_into(
-            buf,
-            info_offset,
-            cid,
-            phone_code,
-            lang_index,
-            driving_side,
-            meas_system,
-            currency_type,
-            voice_lang_bytes,
-            female_tag,
-            male_tag,
-            b"\x00" * 13,
-        )
-
-        # --- COUNTRY_REF_T ---------------------------------------------------
-        local_checksum = (cid + phone_code + feature_offset + info_offset) & 0xFFFF
-
-        country_ref_struct.pack_into(
-            buf,
-            offset_country_refs + idx * COUNTRY_REF_SIZE,
-            cid,
-            entry["code5"],
-            0,                # chain_flags
-            info_offset,      # affix_offset -> COUNTRY_INFO_T
-            feature_offset,   # feature_offset -> FEATURE_SET_T
-            0,                # media_profile_id
-            local_checksum,
-            b"\x00" * 12,
-        )
+    # Fill the three tables column-wise as numpy structured arrays; the
+    # per-country Python work is limited to the small dictionary lookups.
+    idx = np.arange(country_count, dtype=np.uint32)
+    cid = np.array([e["id"] for e in country_entries], dtype=np.uint32)
+    feature_offset = offset_feature_sets + idx * FEATURE_SET_SIZE
+    info_offset = offset_country_infos + idx * COUNTRY_INFO_SIZE
+
+    lang_index = np.array([lang_index_map.get(e["voice_lang"], 0) for e in country_entries])
+    name_keys = [e["name"].upper() for e in country_entries]
+    phone_code = np.array([phone_codes.get(k, 0) for k in name_keys], dtype=np.uint32)
+
+    # --- FEATURE_SET_T --------------------------------------------------------
+    features = np.zeros(country_count, dtype=_OEM_FEATURE_SET_DTYPE)
+    features["region_code"] = cid          # default region code (we use country id)
+    features["language_code"] = lang_index  # default language code
+    features["bitmask1"] = 0x00000001      # basic navigation enabled
+    # bitmask2, bitmask3, model/trim ID stay 0
+
+    # --- COUNTRY_INFO_T (simplified GlbCountry_t analogue) -------------------
+    infos = np.zeros(country_count, dtype=_OEM_COUNTRY_INFO_DTYPE)
+    infos["country_id"] = cid
+    infos["phone_code"] = phone_code
+    infos["lang_code"] = lang_index
+    infos["driving_side"] = [1 if k in left_hand_countries else 0 for k in name_keys]
+    # measurement_system 0 = metric for Europe, currency_type 0 = unknown / default
+    infos["voice_lang"] = [e["voice_lang"].encode("ascii", "replace") for e in country_entries]
+    infos["voice_female"] = [e["voice_female_tag"] for e in country_entries]
+    infos["voice_male"] = [e["voice_male_tag"] for e in country_entries]
+
+    # --- COUNTRY_REF_T -------------------------------------------------------
+    refs = np.zeros(country_count, dtype=_OEM_COUNTRY_REF_DTYPE)
+    refs["country_id"] = cid
+    refs["code"] = [e["code5"] for e in country_entries]
+    refs["affix_offset"] = info_offset       # -> COUNTRY_INFO_T
+    refs["feature_offset"] = feature_offset  # -> FEATURE_SET_T
+    refs["checksum"] = (cid + phone_code + feature_offset + info_offset) & 0xFFFF
+
+    for offset, table in ((offset_country_refs, refs),
+                          (offset_feature_sets, features),
+                          (offset_country_infos, infos)):
+        buf[offset:offset + table.nbytes] = table.tobytes()
 
     # ---- CRC32 (critical) ----------------------------------------------------
     # IEEE 802.3 CRC32, poly 0x04C11DB7, init 0xFFFFFFFF, final XOR 0xFFFFFFFF
-    crc = zlib.crc32(buf[0x10:], 0xFFFFFFFF) ^ 0xFFFFFFFF
+    crc = zlib.crc32(memoryview(buf)[0x10:], 0xFFFFFFFF) ^ 0xFFFFFFFF
     struct.pack_into("<I", buf, 0x0C, crc & 0xFFFFFFFF)
 
     # Write final INIT.SDL
-    dst_path.write_bytes(bytes(buf))
+    dst_path.write_bytes(buf)
 
 # ============================================================================
 # METADATA HELPERS
 # ============================================================================
 
 
+@lru_cache(maxsize=4096)
 def marker_for_file(name: str) -> bytes:
     name = name.upper()
     if name.endswith("0.SDL") or name.endswith("1.SDL"):
@@ -609,6 +641,7 @@ OEM_HEADER = b"SDAL" + b"\x00" * 12
 REGION_LABEL_MAXLEN = 14
 LANG_FIELD_MAXLEN = 30
 REGION_TABLE_ENTRY_SIZE = 16
+REGION_TABLE_ROW_ENTRIES = 10
 
 
 def extract_continent(region_slugs):
@@ -646,6 +679,27 @@ def build_region_translation_table(region_slugs, supp_langs, countries_dict):
     return table
 
 
+def _build_region_body(prefix: bytes, table) -> bytearray:
+    """
+    prefix + region translation table (16-byte name fields, each row padded to
+    10 entries), zero-filled up to at least 4096 bytes.
+    """
+    row_sizes = [max(len(row), REGION_TABLE_ROW_ENTRIES) * REGION_TABLE_ENTRY_SIZE
+                 for row in table]
+    body = bytearray(max(len(prefix) + sum(row_sizes), 4096))
+    body[:len(prefix)] = prefix
+
+    off = len(prefix)
+    for row, row_size in zip(table, row_sizes):
+        pos = off
+        for name in row:
+            name_b = name.encode('ascii', 'replace')[:REGION_TABLE_ENTRY_SIZE]
+            body[pos:pos + len(name_b)] = name_b
+            pos += REGION_TABLE_ENTRY_SIZE
+        off += row_size
+    return body
+
+
 def write_region_sdl(path, region_slugs, supp_lang, countries_dict):
     label = extract_continent(region_slugs)
     supp_langs = [s.strip().upper() for s in supp_lang.split(',')] if supp_lang else ["UKE"]
@@ -659,18 +713,7 @@ def write_region_sdl(path, region_slugs, supp_lang, countries_dict):
     lang_field = b''.join(lang.encode('ascii', 'replace')[:3] for lang in supp_langs)
     lang_field = lang_field[:LANG_FIELD_MAXLEN].ljust(LANG_FIELD_MAXLEN, b' ') + b'\x00'
 
-    region_table = b''
-    for row in table:
-        for name in row:
-            region_table += name.encode('ascii', 'replace')[:REGION_TABLE_ENTRY_SIZE].ljust(
-                REGION_TABLE_ENTRY_SIZE, b'\x00'
-            )
-        for _ in range(10 - len(row)):
-            region_table += b'\x00' * REGION_TABLE_ENTRY_SIZE
-
-    body = header + label_field + lang_field + region_table
-    if len(body) < 4096:
-        body += b'\x00' * (4096 - len(body))
+    body = _build_region_body(header + label_field + lang_field, table)
     with open(path, "wb") as f:
         f.write(body)
 
@@ -679,45 +722,35 @@ def write_regions_sdl(path, region_slugs, supp_lang, countries_dict):
     supp_langs = [s.strip().upper() for s in supp_lang.split(',')] if supp_lang else ["UKE"]
     table = build_region_translation_table(region_slugs, supp_langs, countries_dict)
 
-    header = OEM_HEADER
-    region_table = b''
-    for row in table:
-        for name in row:
-            region_table += name.encode('ascii', 'replace')[:REGION_TABLE_ENTRY_SIZE].ljust(
-                REGION_TABLE_ENTRY_SIZE, b'\x00'
-            )
-        for _ in range(10 - len(row)):
-            region_table += b'\x00' * REGION_TABLE_ENTRY_SIZE
-
-    body = header + region_table
-    if len(body) < 4096:
-        body += b'\x00' * (4096 - len(body))
+    body = _build_region_body(OEM_HEADER, table)
     with open(path, "wb") as f:
         f.write(body)
 
 
 def write_mtoc_sdl(path, files):
-    buf = bytearray(b"\x00" * 64)
-    next_id = 1
+    # 64-byte zero header, then one 64-byte record per file:
+    #   [8:24] name, [28] marker, [29:32] 24-bit file id
+    buf = bytearray(max(64 * (len(files) + 1), 4096))
 
-    for fpath in files:
+    for next_id, fpath in enumerate(files, start=1):
+        off = 64 * next_id
         name = fpath.name.upper()
-        rec = bytearray(b"\x00" * 64)
-        rec[8:8 + 16] = name.encode('ascii', 'replace')[:16].ljust(16, b'\x00')
+        name_b = name.encode('ascii', 'replace')[:16]
+        buf[off + 8:off + 8 + len(name_b)] = name_b
 
         marker = marker_for_file(name)
-        rec[28] = marker[0]
-        rec[29:32] = struct.pack(">I", next_id)[1:]
-        next_id += 1
-
-        buf.extend(rec)
+        struct.pack_into(">I", buf, off + 28, (marker[0] << 24) | (next_id & 0xFFFFFF))
 
-    if len(buf) < 4096:
-        buf.extend(b"\x00" * (4096 - len(buf)))
     with open(path, "wb") as f:
         f.write(buf)
 
 
+# CARTOTOP payload: DBRect_t + entry count, then per entry
+# DBRect_t + db_id, parcel_id, layer_type, scale_min, scale_max + 2 pad bytes
+_CARTOTOP_HEADER_STRUCT = struct.Struct(">iiiiH")
+_CARTOTOP_ENTRY_STRUCT = struct.Struct(">iiiiHHHHH2x")
+
+
 def write_cartotop_sdl(path: pathlib.Path,
                        entries: List[TopologyEntry],
                        pid_cartotop: int):
@@ -726,34 +759,44 @@ def write_cartotop_sdl(path: pathlib.Path,
     parcels for each DB / region.
     """
     if not entries:
-        payload = b"\x00" * 18
+        payload = bytes(_CARTOTOP_HEADER_STRUCT.size)
     else:
-        min_lat = min(e.rect_min_lat_ntu for e in entries)
-        max_lat = max(e.rect_max_lat_ntu for e in entries)
-        min_lon = min(e.rect_min_lon_ntu for e in entries)
-        max_lon = max(e.rect_max_lon_ntu for e in entries)
-
-        buf = bytearray()
-        buf += struct.pack(">iiii", min_lon, min_lat, max_lon, max_lat)
-        buf += struct.pack(">H", len(entries))
-
-        for e in entries:
-            buf += struct.pack(">iiii",
-                               e.rect_min_lon_ntu, e.rect_min_lat_ntu,
-                               e.rect_max_lon_ntu, e.rect_max_lat_ntu)
-            buf += struct.pack(">HHHHH",
-                               e.db_id, e.parcel_id, e.layer_type,
-                               e.scale_min, e.scale_max)
-            buf += b"\x00\x00"
+        # Прямоугольники всех записей одним массивом: (min_lon, min_lat, max_lon, max_lat)
+        rects = np.fromiter(
+            ((e.rect_min_lon_ntu, e.rect_min_lat_ntu,
+              e.rect_max_lon_ntu, e.rect_max_lat_ntu) for e in entries),
+            dtype=np.dtype((np.int64, 4)),
+            count=len(entries),
+        )
+        mn = rects.min(axis=0)
+        mx = rects.max(axis=0)
+        min_lon, min_lat = int(mn[0]), int(mn[1])
+        max_lon, max_lat = int(mx[2]), int(mx[3])
+
+        entry_size = _CARTOTOP_ENTRY_STRUCT.size
+        buf = bytearray(_CARTOTOP_HEADER_STRUCT.size + len(entries) * entry_size)
+        _CARTOTOP_HEADER_STRUCT.pack_into(buf, 0, min_lon, min_lat, max_lon, max_lat, len(entries))
+
+        off = _CARTOTOP_HEADER_STRUCT.size
+        for e, rect in zip(entries, rects.tolist()):
+            _CARTOTOP_ENTRY_STRUCT.pack_into(
+                buf, off,
+                *rect,
+                e.db_id, e.parcel_id, e.layer_type,
+                e.scale_min, e.scale_max,
+            )
+            off += entry_size
         payload = bytes(buf)
 
-    # Wrap as SDAL parcel
-    blob = encode_bytes(pid_cartotop, payload, offset_units=0)
+    # Wrap as SDAL parcel, zero-padded to the next 4 KiB boundary in the same buffer
+    parcel = safe_encode_parcel(pid_cartotop, payload, 0)
+    out = bytearray(align_up(len(parcel)))
+    out[:len(parcel)] = parcel
     with open(path, "wb") as f:
-        f.write(safe_encode_parcel(pid_cartotop, payload, 0))
-        pad = (-len(blob)) & (4096 - 1)
-        if pad:
-            f.write(b"\x00" * pad)
+        f.write(out)
+
+
+_IDXPCL_STRUCT = struct.Struct(">H H I I i i H H H H")
 
 
 def _encode_kdtree_idx_header(kd_data_len: int,
@@ -763,7 +806,6 @@ def _encode_kdtree_idx_header(kd_data_len: int,
     Encodes IDxPclHdr_t (32 bytes) for KDTREE.
     Uses signed integers for coordinates.
     """
-    _IDXPCL_STRUCT = struct.Struct(">H H I I i i H H H H")
     return _IDXPCL_STRUCT.pack(
         1, 1,               # version, flags
         0, kd_data_len,     # reserved, data length
@@ -795,6 +837,30 @@ def init_logging(verbose: bool, work_dir: pathlib.Path):
     logger.addHandler(fh)
 
 
+def _copy_file_fast(src: pathlib.Path, dst: pathlib.Path) -> None:
+    """
+    Kernel-side copy via os.copy_file_range (reflink on Btrfs/XFS), then copystat.
+    Falls back to shutil.copy2 where the syscall is missing or refused.
+    """
+    if not hasattr(os, "copy_file_range"):
+        shutil.copy2(src, dst)
+        return
+    try:
+        with open(src, "rb") as fsrc, open(dst, "wb") as fdst:
+            remaining = os.fstat(fsrc.fileno()).st_size
+            while remaining > 0:
+                n = os.copy_file_range(fsrc.fileno(), fdst.fileno(), remaining)
+                if n == 0:
+                    break
+                remaining -= n
+        if remaining > 0:
+            raise OSError("copy_file_range stopped short")
+    except OSError:
+        shutil.copy2(src, dst)
+        return
+    shutil.copystat(src, dst)
+
+
 def copy_oem_sdl_files(work_dir: pathlib.Path) -> list[pathlib.Path]:
     """
     Copy OEM *.SDL files from project_root/oem_sdl into work_dir, except INIT.SDL.
@@ -812,7 +878,7 @@ def copy_oem_sdl_files(work_dir: pathlib.Path) -> list[pathlib.Path]:
                 continue
             dst = work_dir / src.name
             if not dst.exists():
-                shutil.copy2(src, dst)
+                _copy_file_fast(src, dst)
             result.append(dst)
     except Exception:
         # Non-fatal – just work without OEM extras.
@@ -820,76 +886,473 @@ def copy_oem_sdl_files(work_dir: pathlib.Path) -> list[pathlib.Path]:
     return result
 
 
-def _iter_coords(geom):
-    if isinstance(geom, LineString):
-        yield from geom.coords
-    elif isinstance(geom, MultiLineString):
-        for part in geom.geoms:
-            yield from part.coords
+# Metres per degree of latitude; a degree of longitude is this times cos(center_lat).
+M_PER_DEG_LAT = 111_320.0
+
+
+def scale_to_local_metres(geoms: np.ndarray, center_lat: float) -> np.ndarray:
+    """
+    Equirectangular metres around *center_lat*: x = lon * 111320*cos(lat0),
+    y = lat * 111320. A single linear scale of every vertex replaces the
+    WGS84 -> UTM reprojection; density is a relative heat value, so the
+    distortion away from the region centre is irrelevant.
+    """
+    scale = np.array([M_PER_DEG_LAT * np.cos(np.radians(center_lat)), M_PER_DEG_LAT])
+    return shapely.transform(geoms, lambda xy: xy * scale)
+
+
+def xy_bounds(xy: np.ndarray) -> tuple[float, float, float, float]:
+    """
+    (minx, miny, maxx, maxy) of an N x 2 vertex array; same as total_bounds
+    but a single pass over contiguous coordinates. No vertices give NaN
+    bounds, as total_bounds does for an empty GeoSeries.
+    """
+    if not len(xy):
+        return (np.nan,) * 4
+    minx, miny = xy.min(axis=0)
+    maxx, maxy = xy.max(axis=0)
+    return minx, miny, maxx, maxy
+
+
+# shapely type ids: LineString, LinearRing, MultiLineString
+_LINE_TYPE_IDS = (1, 2, 5)
 
+# Piece end points rasterised per batch: about 50 MiB of temporaries on top of
+# the grid, however long the region's roads are.
+_DENSITY_BATCH_POINTS = 1 << 20
+
+
+def _add_piece_density(density: np.ndarray, coords: np.ndarray, cum: np.ndarray,
+                       first: np.ndarray, last: np.ndarray, part_len: np.ndarray,
+                       n_pieces: np.ndarray, tminx: float, tminy: float,
+                       dx: float, dy: float, grid_size: int) -> None:
+    """
+    Cuts the parts [first, last] into their n_pieces pieces and adds every
+    piece's chord length to the flat *density* cell holding its midpoint.
+    """
+    # Piece end points at fractions 0, 1/n, ..., 1 of every part
+    pts_per_part = n_pieces + 1
+    owner = np.repeat(np.arange(len(first)), pts_per_part)
+    k = np.arange(len(owner)) - np.repeat(np.cumsum(pts_per_part) - pts_per_part, pts_per_part)
+    target = cum[first][owner] + part_len[owner] * (k / n_pieces[owner])
+
+    seg = np.searchsorted(cum, target, side="right") - 1
+    seg = np.clip(seg, first[owner], last[owner] - 1)
+    seg_len = cum[seg + 1] - cum[seg]
+    t = np.divide(target - cum[seg], seg_len, out=np.zeros_like(target), where=seg_len > 0)
+    pts = coords[seg] + t[:, None] * (coords[seg + 1] - coords[seg])
+    del k, target, seg_len, t
+
+    same = owner[1:] == owner[:-1]
+    p0 = pts[:-1][same]
+    p1 = pts[1:][same]
+    del owner, seg, pts, same
+    piece_len = np.hypot(*(p1 - p0).T)
+    mid = (p0 + p1) * 0.5
+    del p0, p1
+
+    col = np.floor((mid[:, 0] - tminx) / dx).astype(np.int64)
+    row = np.floor((mid[:, 1] - tminy) / dy).astype(np.int64)
+    inside = (col >= 0) & (col < grid_size) & (row >= 0) & (row < grid_size)
+    density += np.bincount(row[inside] * grid_size + col[inside],
+                           weights=piece_len[inside],
+                           minlength=grid_size * grid_size).astype(np.float32)
+
+
+def accumulate_line_density(geoms, tminx: float, tminy: float,
+                            dx: float, dy: float, grid_size: int) -> np.ndarray:
+    """
+    Rasterises the line parts of *geoms* into a (grid_size, grid_size) float32
+    density grid whose cells are dx x dy, starting at (tminx, tminy).
 
-def choose_scale_shift_for_nodes(nodes: List[NodeRecord]) -> int:
+    Every line is cut into equal pieces no longer than half a cell; each
+    piece adds its chord length to the cell holding its midpoint. All of it
+    is done on flat coordinate arrays, without per-piece GEOS calls, a batch
+    of parts at a time so memory does not grow with the total road length.
+    """
+    density = np.zeros(grid_size * grid_size, dtype=np.float32)
+
+    geoms = np.asarray(geoms, dtype=object)
+    parts = shapely.get_parts(geoms[np.isin(shapely.get_type_id(geoms), _LINE_TYPE_IDS)])
+    parts = parts[~shapely.is_empty(parts)]
+    if len(parts):
+        coords, part_idx = shapely.get_coordinates(parts, return_index=True)
+        first = np.searchsorted(part_idx, np.arange(len(parts)))
+        last = np.append(first[1:], len(coords)) - 1
+
+        # Cumulative length along each part; no length between parts
+        edge = np.hypot(*np.diff(coords, axis=0).T)
+        edge[part_idx[1:] != part_idx[:-1]] = 0.0
+        cum = np.concatenate(([0.0], np.cumsum(edge)))
+        del part_idx, edge
+        part_len = cum[last] - cum[first]
+
+        keep = part_len > 0
+        first, last, part_len = first[keep], last[keep], part_len[keep]
+
+        max_seg_length = min(dx, dy) / 2.0
+        n_pieces = np.maximum(1, np.ceil(part_len / max_seg_length)).astype(np.int64)
+
+        # Whole parts per batch, up to _DENSITY_BATCH_POINTS end points
+        # (a single longer part still goes in one batch of its own)
+        ends = np.cumsum(n_pieces + 1)
+        start = 0
+        while start < len(first):
+            budget = ends[start] - (n_pieces[start] + 1) + _DENSITY_BATCH_POINTS
+            stop = max(start + 1, int(np.searchsorted(ends, budget, side="right")))
+            batch = slice(start, stop)
+            _add_piece_density(density, coords, cum, first[batch], last[batch],
+                               part_len[batch], n_pieces[batch],
+                               tminx, tminy, dx, dy, grid_size)
+            start = stop
+
+    return density.reshape(grid_size, grid_size)
+
+
+def choose_scale_shift_for_nodes(nodes: NodeTable) -> int:
     """
     Simple scale heuristic; detailed scaling logic lives in routing_format.py.
     """
     return 12
 
 
-def build_routing_graph_from_roads_df(roads_df) -> tuple[list[NodeRecord], list[SegmentRecord]]:
-    nodes_map = {}
-    node_records = {}
-    segments: list[SegmentRecord] = []
+def build_routing_graph_from_roads_df(roads_df, xy: np.ndarray | None = None,
+                                      index: np.ndarray | None = None) -> tuple[NodeTable, SegmentTable]:
+    """
+    Builds routing nodes (deduplicated road vertices) and segments (consecutive
+    vertex pairs), as a NodeTable and a SegmentTable.
 
-    next_node_id = 0
-    next_seg_id = 0
+    *xy*/*index* may pass in shapely.get_coordinates(roads_df.geometry.values,
+    return_index=True) when the caller already has it.
+    """
+    geoms = np.asarray(roads_df.geometry.values, dtype=object)
+    if xy is None:
+        xy, index = shapely.get_coordinates(geoms, return_index=True)
+
+    # Only (Multi)LineStrings with at least two vertices contribute to the graph.
+    is_line = np.isin(shapely.get_type_id(geoms), _LINE_TYPE_IDS)
+    vertex_count = np.bincount(index, minlength=len(geoms))
+    keep = is_line[index] & (vertex_count[index] >= 2)
+    xy = xy[keep]
+    index = index[keep]
+
+    # Deduplicate vertices with one C-level sort: each (lon, lat) pair is viewed
+    # as a single 16-byte key (+ 0.0 folds -0.0 into 0.0 so equal floats match).
+    # Node ids are then ranked by first appearance, as the old dict lookup did.
+    keys = np.ascontiguousarray(xy + 0.0).view(np.dtype((np.void, 16))).ravel()
+    _, first_seen, inverse = np.unique(keys, return_index=True, return_inverse=True)
+    order = np.argsort(first_seen)
+    rank = np.empty_like(order)
+    rank[order] = np.arange(len(order))
+    vertex_node = rank[inverse]
+
+    node_xy = xy[first_seen[order]]
+    ordered_nodes = NodeTable(
+        node_id=np.arange(len(node_xy), dtype=np.int64),
+        lat_deg=node_xy[:, 1],
+        lon_deg=node_xy[:, 0],
+    )
 
-    for _, row in roads_df.iterrows():
-        geom = row["geometry"]
-        coords = list(_iter_coords(geom))
-        if len(coords) < 2:
-            continue
+    # A segment joins each pair of consecutive vertices of the same road.
+    same_road = index[1:] == index[:-1]
+    lon1 = xy[:-1, 0][same_road]
+    lat1 = xy[:-1, 1][same_road]
+    lon2 = xy[1:, 0][same_road]
+    lat2 = xy[1:, 1][same_road]
+
+    mean_lat_rad = np.radians((lat1 + lat2) * 0.5)
+    dx = (lon2 - lon1) * 111_320.0 * np.cos(mean_lat_rad)
+    dy = (lat2 - lat1) * 110_540.0
+
+    seg_count = len(lon1)
+    segments = SegmentTable(
+        seg_id=np.arange(seg_count, dtype=np.int64),
+        from_node_id=vertex_node[:-1][same_road],
+        to_node_id=vertex_node[1:][same_road],
+        length_m=np.sqrt(dx * dx + dy * dy),
+        speed_class=np.zeros(seg_count, dtype=np.uint8),
+        oneway=np.zeros(seg_count, dtype=np.uint8),
+    )
 
-        line_node_ids = []
-        for lon, lat in coords:
-            key = (lon, lat)
-            nid = nodes_map.get(key)
-            if nid is None:
-                nid = next_node_id
-                nodes_map[key] = nid
-                node_records[nid] = NodeRecord(
-                    node_id=nid,
-                    lat_deg=lat,
-                    lon_deg=lon
-                )
-                next_node_id += 1
-            line_node_ids.append(nid)
-
-        for i in range(len(line_node_ids) - 1):
-            n1 = line_node_ids[i]
-            n2 = line_node_ids[i + 1]
-            lon1, lat1 = coords[i]
-            lon2, lat2 = coords[i + 1]
-
-            mean_lat_rad = math.radians((lat1 + lat2) * 0.5)
-            dx = (lon2 - lon1) * 111_320.0 * math.cos(mean_lat_rad)
-            dy = (lat2 - lat1) * 110_540.0
-            length_m = (dx * dx + dy * dy) ** 0.5
-
-            seg = SegmentRecord(
-                seg_id=next_seg_id,
-                from_node_id=n1,
-                to_node_id=n2,
-                length_m=length_m,
-                speed_class=0,
-                oneway=0,
+    return ordered_nodes, segments
+
+# POIGEOM record: uncompressed flag (BE) + lat/lon in 1e-6 deg (LE)
+_POI_GEOM_DTYPE = np.dtype([("flag", ">u2"), ("lat", "<i4"), ("lon", "<i4")])
+# POI index offsets advance by the 8-byte lat/lon payload + 6
+POI_OFFSET_STEP = 14
+
+# ============================================================================
+# PER-REGION WORKERS
+# ============================================================================
+
+
+def _map_regions(fn: Callable[..., Any], *iterables) -> list[Any]:
+    """
+    pool.map over regions: each region is independent until the final merge,
+    so the CPU-bound GEOS/numpy work runs in separate processes.
+    Results keep the input order.
+    """
+    items = list(zip(*iterables))
+    workers = min(len(items), os.cpu_count() or 1)
+    if workers <= 1:
+        return [fn(*args) for args in items]
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        return list(pool.map(fn, *zip(*items)))
+
+
+def _encode_names(names) -> list[bytes]:
+    """
+    ASCII bytes of a name column ('replace' errors); missing names give b"".
+    Cast to object first: an empty or all-NaN column may come back as float
+    dtype, which has no .str accessor.
+    """
+    return names.astype(object).fillna("").str.encode("ascii", "replace").tolist()
+
+
+def _region_density_tiles(region: str, roads_df) -> list[bytes]:
+    """
+    Density tiles (Z=0..3, 85 x 256x256 <u2 grids) for one region.
+    """
+    log = logging.getLogger(__name__)
+    tiles: list[bytes] = []
+
+    road_xy = shapely.get_coordinates(roads_df.geometry.values)
+    minx, miny, maxx, maxy = xy_bounds(road_xy)
+
+    center_lat = (miny + maxy) / 2.0
+    roads_m = scale_to_local_metres(roads_df.geometry.values, center_lat)
+    pminx, pminy, pmaxx, pmaxy = xy_bounds(shapely.get_coordinates(roads_m))
+    del road_xy
+
+    grid_size = 256
+    max_zoom = 3
+    fine_size = grid_size << max_zoom
+    empty_tile = bytes(grid_size * grid_size * 2)
+
+    total_tiles_count = sum(4 ** z for z in range(max_zoom + 1))
+    log.info("Generating Density tiles for %s...", region)
+
+    # One pass over the road geometry at the finest zoom (Z=3); coarser zooms
+    # are 2x2 block sums of the level below, so nothing is clipped per tile.
+    if pmaxx > pminx and pmaxy > pminy:
+        fine = accumulate_line_density(
+            roads_m, pminx, pminy,
+            (pmaxx - pminx) / fine_size, (pmaxy - pminy) / fine_size, fine_size,
+        )
+    else:
+        fine = np.zeros((fine_size, fine_size), dtype=np.float32)
+    # Geometry is not needed past rasterisation: free it before the levels are built
+    del roads_m
+
+    levels = [fine]
+    for _ in range(max_zoom):
+        prev = levels[0]
+        half = prev.shape[0] // 2
+        levels.insert(0, prev.reshape(half, 2, half, 2).sum(axis=(1, 3), dtype=np.float32))
+    del fine
+
+    with tqdm(total=total_tiles_count, desc=f"Density {region}", unit="tile") as pbar:
+        for Z, level in enumerate(levels):
+            num_tiles = 2 ** Z
+            for tx in range(num_tiles):
+                for ty in range(num_tiles):
+                    density_array = level[ty * grid_size:(ty + 1) * grid_size,
+                                          tx * grid_size:(tx + 1) * grid_size]
+
+                    max_val = density_array.max()
+                    if max_val <= 0:
+                        tiles.append(empty_tile)
+                        pbar.update(1)
+                        continue
+
+                    density_scaled = (
+                        (density_array * (65535.0 / max_val))
+                        .clip(0, 65535)
+                        .astype(np.uint16)
+                    )
+                    tiles.append(density_scaled.astype("<u2").tobytes())
+                    pbar.update(1)
+
+    del levels
+    return tiles
+
+
+def _build_region_files(region: str, db_id: int, roads_df, work: pathlib.Path,
+                        format_mode: str) -> tuple[list[pathlib.Path], list[TopologyEntry]]:
+    """
+    Writes the NAV name file ({STEM}0.SDL) and the map file ({STEM}1.SDL) of one
+    region. Returns both paths and the region's CARTOTOP topology entries.
+    """
+    PIDS = PIDS_OEM if format_mode.upper() == "OEM" else PIDS_STD
+    topology_entries: list[TopologyEntry] = []
+
+    roads_df = roads_df[["id", "name", "geometry"]]
+
+    stem = pathlib.Path(region).name.upper().replace("-", "_")
+
+    road_xy, road_index = shapely.get_coordinates(roads_df.geometry.values, return_index=True)
+    minx, miny, maxx, maxy = xy_bounds(road_xy)
+    min_lat_ntu, min_lon_ntu = deg_to_ntu(miny, minx)
+    max_lat_ntu, max_lon_ntu = deg_to_ntu(maxy, maxx)
+    region_rect_ntu = (min_lat_ntu, max_lat_ntu, min_lon_ntu, max_lon_ntu)
+
+    # --- NAV NAME PARCELS (PID NAV) --------------------------------------
+    MAX_NAV_NAME_STRINGS = 2000
+    fast_file = work / f"{stem}0.SDL"
+    names = _encode_names(roads_df["name"])
+
+    if not names:
+        fast_file.write_bytes(safe_encode_parcel(PIDS.NAV, b'', 0))
+    else:
+        with open(fast_file, "wb", buffering=WRITE_BUFFER_SIZE) as f:
+            for i in tqdm(range(0, len(names), MAX_NAV_NAME_STRINGS),
+                          desc=f"NAV Name Parcels {stem}"):
+                name_chunk = names[i:i + MAX_NAV_NAME_STRINGS]
+                write_parcel(f, PIDS.NAV, encode_strings(PIDS.NAV, name_chunk))
+
+    # --- CARTO + BTREE chunking ------------------------------------------
+    # Records as parallel arrays: one per road with line geometry
+    is_line = np.isin(shapely.get_type_id(roads_df.geometry.values), _LINE_TYPE_IDS)
+    vertex_counts = np.bincount(road_index, minlength=len(roads_df))
+    has_record = is_line & (vertex_counts > 0)
+
+    rec_way_ids = roads_df["id"].to_numpy()[has_record]
+    rec_counts = vertex_counts[has_record]
+    rec_coords = road_xy[has_record[road_index]]
+    rec_first = np.cumsum(rec_counts) - rec_counts
+
+    MAX_CARTO_RECORDS = 200
+    record_chunks = []
+    offset_chunks = []
+    for start in range(0, len(rec_way_ids), MAX_CARTO_RECORDS):
+        end = min(start + MAX_CARTO_RECORDS, len(rec_way_ids))
+        ids = rec_way_ids[start:end]
+        counts = rec_counts[start:end]
+        v_end = rec_first[end] if end < len(rec_first) else len(rec_coords)
+        record_chunks.append((ids, counts, rec_coords[rec_first[start]:v_end]))
+
+        # internal offset of each record inside the carto payload
+        sizes = 6 + counts * 8
+        offs = CARTO_HEADER_SIZE + np.cumsum(sizes) - sizes
+        offset_chunks.append((ids, offs))
+
+    nodes, segments = build_routing_graph_from_roads_df(roads_df, road_xy, road_index)
+    del road_xy, road_index, rec_coords
+    scale_shift = choose_scale_shift_for_nodes(nodes)
+
+    map_file = work / f"{stem}1.SDL"
+    parcel_builders: list[ParcelBuilder] = []
+
+    # CARTO + BTREE
+    for chunk_records, chunk_offsets in zip(record_chunks, offset_chunks):
+
+        def make_carto_parcel(offset_units: int,
+                              _records=chunk_records,
+                              _rect=region_rect_ntu):
+            return encode_cartography(
+                PIDS.CARTO,
+                *_records,
+                offset_units=offset_units,
+                rect_ntu=_rect,
+                compress_type=NO_COMPRESSION,
             )
-            segments.append(seg)
-            node_records[n1].segment_ids.append(seg.seg_id)
-            node_records[n2].segment_ids.append(seg.seg_id)
-            next_seg_id += 1
 
-    ordered_nodes = [node_records[nid] for nid in sorted(node_records.keys())]
-    return ordered_nodes, segments
+        def make_btree_parcel(offset_units: int,
+                              _offsets=chunk_offsets):
+            return encode_btree(
+                PIDS.BTREE,
+                *_offsets,
+                offset_units=offset_units,
+                compress_type=NO_COMPRESSION,
+            )
+
+        parcel_builders.append(
+            ParcelBuilder(
+                pid=PIDS.CARTO,
+                layer_type=0,
+                make=make_carto_parcel,
+                rect=region_rect_ntu,
+                scale_min=0,
+                scale_max=0xFFFF,
+            )
+        )
+        parcel_builders.append(
+            ParcelBuilder(
+                pid=PIDS.BTREE,
+                layer_type=2,
+                make=make_btree_parcel,
+                rect=region_rect_ntu,
+                scale_min=0,
+                scale_max=0xFFFF,
+            )
+        )
+
+    # ROUTING (chunked)
+    MAX_ROUTING_CHUNK = 1000  # ~20-30KB payload per chunk
+    # Each chunk carries the segments leaving its own nodes
+    segments, seg_offsets = segments_by_from_node(segments, len(nodes))
+    for i in range(0, len(nodes), MAX_ROUTING_CHUNK):
+        end = min(i + MAX_ROUTING_CHUNK, len(nodes))
+        n_chunk = nodes[i:end]
+        s_chunk = segments[seg_offsets[i]:seg_offsets[end]]
+
+        def make_routing_parcel(offset_units: int,
+                                _nodes=n_chunk,
+                                _segments=s_chunk,
+                                _scale_shift=scale_shift,
+                                _rect=region_rect_ntu):
+            return encode_routing_parcel(
+                pid=PIDS.ROUTING,
+                nodes=_nodes,
+                segments=_segments,
+                region=1,
+                parcel_type=0,
+                parcel_desc=0x02,
+                offset_units=offset_units,
+                rect_ntu=_rect,
+                scale_shift=_scale_shift,
+                size_index=0,
+                compress_type=NO_COMPRESSION,
+            )
+
+        parcel_builders.append(
+            ParcelBuilder(
+                pid=PIDS.ROUTING,
+                layer_type=1,
+                make=make_routing_parcel,
+                rect=region_rect_ntu,
+                scale_min=0,
+                scale_max=0xFFFF,
+            )
+        )
+
+    build_region_sdl_file(
+        format_mode,
+        map_file,
+        db_id=db_id,
+        sdl_name=map_file.name,
+        parcel_builders=parcel_builders,
+        topology_entries=topology_entries,
+        pids=PIDS,
+    )
+    return [fast_file, map_file], topology_entries
+
+
+def _process_region(region: str, db_id: int, work: pathlib.Path, format_mode: str
+                    ) -> tuple[list[bytes], list[pathlib.Path], list[TopologyEntry]]:
+    """
+    Parses the region's road network once and feeds both the density tiles
+    and the region SDL files from it.
+    """
+    log = logging.getLogger(__name__)
+    pbf_path = work / f"{region.replace('/', '-')}.osm.pbf"
+    roads_df = load_road_network(str(pbf_path))
+    log.info("Loaded %d road geometries from %s", len(roads_df), region)
+
+    tiles = _region_density_tiles(region, roads_df)
+    files, entries = _build_region_files(region, db_id, roads_df, work, format_mode)
+    return tiles, files, entries
+
 
 # ============================================================================
 # MAIN BUILD FUNCTION
@@ -911,9 +1374,11 @@ def build(regions: list[str],
         PIDS = PIDS_STD
         log.info("Using Standard SDAL 1.7 PID Profile")
 
-    # Ensure OSM regions are present
-    for region in regions:
-        download_region_if_needed(region, work)
+    # Ensure OSM regions are present: all downloads start now, and each
+    # region only waits for its own PBF, so later downloads overlap parsing.
+    download_pool = ThreadPoolExecutor(max_workers=4)
+    downloads = {r: download_pool.submit(download_region_if_needed, r, work) for r in regions}
+    download_pool.shutdown(wait=False)
 
     topology_entries: list[TopologyEntry] = []
     db_for_region: dict[str, int] = {r: i + 1 for i, r in enumerate(regions)}
@@ -921,47 +1386,59 @@ def build(regions: list[str],
     # -------------------------------------------------------------------------
     # 1. POI processing – global (across all regions)
     # -------------------------------------------------------------------------
-    all_poi_names: list[str] = []
-    poi_records = []
-    poi_offsets = []
-    poi_coords: list[tuple[float, float]] = []
-    offset_acc = 0
-    poi_index_counter = 0
-
-    for region in regions:
-        pbf_path = work / f"{region.replace('/', '-')}.osm.pbf"
-        pois_df = load_poi_data(pbf_path=str(pbf_path), logger=log, poi_tags=None)
-
-        all_poi_names.extend(pois_df["name"].fillna("").tolist())
-
-        for geom_idx, geom in zip(pois_df.index, pois_df.geometry):
-            if not isinstance(geom, Point):
-                geom = geom.centroid
-            lon, lat = geom.x, geom.y
+    all_poi_names: list[bytes] = []
+    region_lons: list[np.ndarray] = []
+    region_lats: list[np.ndarray] = []
 
-            payload = struct.pack("<ii", int(lat * 1e6), int(lon * 1e6))
-            poi_records.append((int(poi_index_counter), payload))
-            poi_offsets.append((int(poi_index_counter), offset_acc))
-
-            offset_acc += len(payload) + 6
-            poi_coords.append((lon, lat))
-            poi_index_counter += 1
+    # A failure here must not leave queued PBF downloads running (the
+    # interpreter would join them at exit): cancel what has not started.
+    try:
+        for region in regions:
+            downloads[region].result()
+            pbf_path = work / f"{region.replace('/', '-')}.osm.pbf"
+            pois_df = load_poi_data(pbf_path=str(pbf_path), logger=log, poi_tags=None)
+            # POIs without a geometry have no position to store: drop them
+            geoms = pois_df.geometry.values
+            pois_df = pois_df[~(shapely.is_missing(geoms) | shapely.is_empty(geoms))]
+
+            # Encode the whole column once; encode_strings takes the bytes as-is.
+            all_poi_names.extend(_encode_names(pois_df["name"]))
+
+            # Centroid of a Point is the point itself, so one call covers all geometry types
+            centers = shapely.centroid(pois_df.geometry.values)
+            region_lons.append(shapely.get_x(centers))
+            region_lats.append(shapely.get_y(centers))
+    except BaseException:
+        download_pool.shutdown(wait=False, cancel_futures=True)
+        raise
+
+    poi_lon = np.concatenate(region_lons) if region_lons else np.empty(0)
+    poi_lat = np.concatenate(region_lats) if region_lats else np.empty(0)
+    poi_count = len(poi_lon)
+    del region_lons, region_lats
+
+    # POI geometry records as one array (SoA -> a single tobytes per parcel)
+    poi_geom = np.zeros(poi_count, dtype=_POI_GEOM_DTYPE)
+    poi_geom["flag"] = UNCOMPRESSED_FLAG
+    poi_geom["lat"] = (poi_lat * 1e6).astype(np.int32)   # truncation, as int()
+    poi_geom["lon"] = (poi_lon * 1e6).astype(np.int32)
+    poi_ids = np.arange(poi_count, dtype=np.int64)
+    poi_offsets = poi_ids * POI_OFFSET_STEP
+    poi_coords = np.column_stack((poi_lon, poi_lat))
 
     # -------------------------------------------------------------------------
     # 2. GLOBAL KD-TREE (for POI)
     # -------------------------------------------------------------------------
     log.info("Building Global KD-Tree...")
-    if not poi_coords:
+    if not poi_count:
         kd_data = b""
         min_lat_ntu = max_lat_ntu = min_lon_ntu = max_lon_ntu = 0
     else:
         kd_tree_obj = build_kdtree(poi_coords)
         kd_data = serialize_kdtree(kd_tree_obj)
 
-        all_lons = [c[0] for c in poi_coords]
-        all_lats = [c[1] for c in poi_coords]
-        min_lat_ntu, min_lon_ntu = deg_to_ntu(min(all_lats), min(all_lons))
-        max_lat_ntu, max_lon_ntu = deg_to_ntu(max(all_lats), max(all_lons))
+        min_lat_ntu, min_lon_ntu = deg_to_ntu(float(poi_lat.min()), float(poi_lon.min()))
+        max_lat_ntu, max_lon_ntu = deg_to_ntu(float(poi_lat.max()), float(poi_lon.max()))
 
         del kd_tree_obj
 
@@ -979,38 +1456,33 @@ def build(regions: list[str],
     if not all_poi_names:
         poi_name_file.write_bytes(safe_encode_parcel(PIDS.POI_NAME, b'', 0))
     else:
-        with open(poi_name_file, "wb") as f:
+        with open(poi_name_file, "wb", buffering=WRITE_BUFFER_SIZE) as f:
             for i in tqdm(range(0, len(all_poi_names), MAX_POI_NAME_STRINGS),
                           desc="POI Name Parcels"):
                 name_chunk = all_poi_names[i:i + MAX_POI_NAME_STRINGS]
-                raw_payload = encode_strings(PIDS.POI_NAME, name_chunk)
-                parcel_with_header = safe_encode_parcel(PIDS.POI_NAME, raw_payload, 0)
-                f.write(parcel_with_header)
+                write_parcel(f, PIDS.POI_NAME, encode_strings(PIDS.POI_NAME, name_chunk))
 
     global_files.append(poi_name_file)
 
     poi_geom_file = work / "POIGEOM.SDL"
     MAX_POI_RECORDS_CHUNK = 5000
 
-    log.info("Chunking %d POI geom/index records...", len(poi_records))
+    log.info("Chunking %d POI geom/index records...", poi_count)
 
-    with open(poi_geom_file, "wb") as f:
+    with open(poi_geom_file, "wb", buffering=WRITE_BUFFER_SIZE) as f:
         # 1) POI GEOMETRY
-        for i in tqdm(range(0, len(poi_records), MAX_POI_RECORDS_CHUNK),
+        for i in tqdm(range(0, poi_count, MAX_POI_RECORDS_CHUNK),
                       desc="POI Geom Parcels"):
-            geom_chunk = poi_records[i:i + MAX_POI_RECORDS_CHUNK]
-            poi_geom_blob_chunk = b"".join(
-                struct.pack(">H", UNCOMPRESSED_FLAG) + rec[1]
-                for rec in geom_chunk
-            )
-            f.write(safe_encode_parcel(PIDS.POI_GEOM, poi_geom_blob_chunk, 0))
+            write_parcel(f, PIDS.POI_GEOM, poi_geom[i:i + MAX_POI_RECORDS_CHUNK].tobytes())
 
         # 2) POI INDEX
-        for i in tqdm(range(0, len(poi_offsets), MAX_POI_RECORDS_CHUNK),
+        for i in tqdm(range(0, poi_count, MAX_POI_RECORDS_CHUNK),
                       desc="POI Index Parcels"):
-            index_chunk = poi_offsets[i:i + MAX_POI_RECORDS_CHUNK]
-            poi_index_payload_chunk = encode_poi_index(PIDS.POI_INDEX, index_chunk)
-            f.write(safe_encode_parcel(PIDS.POI_INDEX, poi_index_payload_chunk, 0))
+            end = min(i + MAX_POI_RECORDS_CHUNK, poi_count)
+            poi_index_payload_chunk = encode_poi_index(
+                PIDS.POI_INDEX, poi_ids[i:end], poi_offsets[i:end]
+            )
+            write_parcel(f, PIDS.POI_INDEX, poi_index_payload_chunk)
 
     global_files.append(poi_geom_file)
 
@@ -1033,11 +1505,12 @@ def build(regions: list[str],
 
         chunk_size_bytes = MAX_KDTREE_NODES_PER_PARCEL * KDTREE_NODE_SIZE
 
-        with open(kd_file, "wb") as f:
+        kd_view = memoryview(kd_data)
+        with open(kd_file, "wb", buffering=WRITE_BUFFER_SIZE) as f:
             is_first_chunk = True
             for i in tqdm(range(0, len(kd_data), chunk_size_bytes),
                           desc="KD-Tree Parcels"):
-                data_chunk = kd_data[i:i + chunk_size_bytes]
+                data_chunk = kd_view[i:i + chunk_size_bytes]
 
                 if is_first_chunk:
                     current_header = _encode_kdtree_idx_header(
@@ -1045,112 +1518,27 @@ def build(regions: list[str],
                         min_lat_ntu, max_lat_ntu,
                         min_lon_ntu, max_lon_ntu,
                     )
-                    raw_payload = current_header + data_chunk
+                    write_parcel(f, PIDS.KDTREE, current_header, data_chunk)
                     is_first_chunk = False
                 else:
-                    raw_payload = data_chunk
-
-                f.write(safe_encode_parcel(PIDS.KDTREE, raw_payload, 0))
+                    write_parcel(f, PIDS.KDTREE, data_chunk)
 
     global_files.append(kd_file)
 
     # -------------------------------------------------------------------------
-    # 5. DENSITY (DENSxx0/1.SDL) – per-disc, derived from roads
+    # 5. PER-REGION ROADS: density tiles + region SDLs, one PBF parse each
     # -------------------------------------------------------------------------
+    region_results = _map_regions(
+        partial(_process_region, work=work, format_mode=format_mode),
+        regions,
+        [db_for_region[r] for r in regions],
+    )
+
+    # DENSITY (DENSxx0/1.SDL) – per-disc, derived from roads
     disc_code = extract_disc_code(regions)
     dens_tiles = []
-
-    for region in regions:
-        pbf_path = work / f"{region.replace('/', '-')}.osm.pbf"
-        roads_df = load_road_network(str(pbf_path))
-        log.info("Loaded %d road geometries for density from %s", len(roads_df), region)
-
-        bbox = roads_df.total_bounds
-        minx, miny, maxx, maxy = bbox
-
-        center_x = (minx + maxx) / 2.0
-        utm_zone = int((center_x + 180) / 6) + 1
-        utm_crs = f"EPSG:{32600 + utm_zone}"
-
-        roads_proj = roads_df.to_crs(utm_crs)
-        proj_bounds = roads_proj.total_bounds
-        pminx, pminy, pmaxx, pmaxy = proj_bounds
-
-        roads_simple = roads_proj.explode(ignore_index=True)
-        roads_simple = roads_simple[roads_simple.geometry.type.isin(
-            ["LineString", "MultiLineString"]
-        )]
-
-        total_tiles_count = sum(4 ** z for z in range(4))
-        log.info("Generating Density tiles for %s...", region)
-
-        with tqdm(total=total_tiles_count, desc=f"Density {region}", unit="tile") as pbar:
-            for Z in range(0, 4):
-                num_tiles = 2 ** Z
-                tile_width = (pmaxx - pminx) / num_tiles
-                tile_height = (pmaxy - pminy) / num_tiles
-
-                for tx in range(num_tiles):
-                    for ty in range(num_tiles):
-                        tminx = pminx + tx * tile_width
-                        tmaxx = pminx + (tx + 1) * tile_width
-                        tminy = pminy + ty * tile_height
-                        tmaxy = pminy + (ty + 1) * tile_height
-
-                        grid_size = 256
-                        dx = (tmaxx - tminx) / grid_size
-                        dy = (tmaxy - tminy) / grid_size
-
-                        density_array = np.zeros((grid_size, grid_size), dtype=np.float64)
-                        tile_box = box(tminx, tminy, tmaxx, tmaxy)
-                        clipped = roads_simple.geometry.intersection(tile_box)
-
-                        max_seg_length = min(dx, dy) / 2.0
-
-                        for seg_geom in clipped:
-                            if seg_geom.is_empty:
-                                continue
-
-                            if seg_geom.geom_type == "LineString":
-                                geoms = [seg_geom]
-                            elif seg_geom.geom_type == "MultiLineString":
-                                geoms = list(seg_geom.geoms)
-                            else:
-                                geoms = []
-
-                            for g in geoms:
-                                total_len = g.length
-                                if total_len <= 0:
-                                    continue
-
-                                n_pieces = max(1, int(np.ceil(total_len / max_seg_length)))
-                                fractions = np.linspace(0, 1, n_pieces + 1)
-
-                                prev_pt = seg_geom.interpolate(fractions[0], normalized=True)
-                                for i in range(1, len(fractions)):
-                                    curr_pt = seg_geom.interpolate(fractions[i], normalized=True)
-                                    seg_len = prev_pt.distance(curr_pt)
-
-                                    midpoint = LineString([prev_pt, curr_pt]).centroid
-                                    mx, my = midpoint.x, midpoint.y
-
-                                    col = int((mx - tminx) // dx)
-                                    row = int((my - tminy) // dy)
-                                    if 0 <= col < grid_size and 0 <= row < grid_size:
-                                        density_array[row, col] += seg_len
-                                    prev_pt = curr_pt
-
-                        max_val = density_array.max()
-                        scale = 65535.0 / max_val if max_val > 0 else 0.0
-                        density_scaled = (
-                            (density_array * scale)
-                            .clip(0, 65535)
-                            .astype(np.uint16)
-                        )
-                        dens_tiles.append(density_scaled.astype("<u2").tobytes())
-                        pbar.update(1)
-
-        del roads_df, roads_proj, roads_simple
+    for tiles, _, _ in region_results:
+        dens_tiles.extend(tiles)
 
     if dens_tiles:
         raw_data = b"".join(dens_tiles)
@@ -1170,196 +1558,49 @@ def build(regions: list[str],
         global_files.append(dens0)
 
     # -------------------------------------------------------------------------
-    # 6. PER-REGION SDLs (NAV names, CARTO, BTREE, ROUTING)
+    # 6. PER-REGION SDLs (NAV names, CARTO, BTREE, ROUTING) – written in step 5
     # -------------------------------------------------------------------------
     region_files: list[pathlib.Path] = []
 
-    for region in regions:
-        db_id = db_for_region[region]
-
-        pbf_path = work / f"{region.replace('/', '-')}.osm.pbf"
-        roads_df = load_road_network(str(pbf_path))[["id", "name", "geometry"]]
-
-        stem = pathlib.Path(region).name.upper().replace("-", "_")
-
-        minx, miny, maxx, maxy = roads_df.total_bounds
-        min_lat_ntu, min_lon_ntu = deg_to_ntu(miny, minx)
-        max_lat_ntu, max_lon_ntu = deg_to_ntu(maxy, maxx)
-        region_rect_ntu = (min_lat_ntu, max_lat_ntu, min_lon_ntu, max_lon_ntu)
-
-        # --- NAV NAME PARCELS (PID NAV) --------------------------------------
-        MAX_NAV_NAME_STRINGS = 2000
-        fast_file = work / f"{stem}0.SDL"
-        names = roads_df["name"].fillna("").tolist()
-
-        if not names:
-            fast_file.write_bytes(safe_encode_parcel(PIDS.NAV, b'', 0))
-        else:
-            with open(fast_file, "wb") as f:
-                for i in tqdm(range(0, len(names), MAX_NAV_NAME_STRINGS),
-                              desc=f"NAV Name Parcels {stem}"):
-                    name_chunk = names[i:i + MAX_NAV_NAME_STRINGS]
-                    raw_payload = encode_strings(PIDS.NAV, name_chunk)
-                    parcel_with_header = safe_encode_parcel(PIDS.NAV, raw_payload, 0)
-                    f.write(parcel_with_header)
-
-        # --- CARTO + BTREE chunking ------------------------------------------
-        records: list[tuple[int, list[tuple[float, float]]]] = []
-        for wid, geom in tqdm(zip(roads_df["id"], roads_df.geometry),
-                              total=len(roads_df),
-                              unit="road",
-                              desc=f"Processing Roads {region}"):
-            coords = list(_iter_coords(geom))
-            if not coords:
-                continue
-            records.append((wid, coords))
-
-        MAX_CARTO_RECORDS = 200
-        record_chunks = []
-        offset_chunks = []
-        idx = 0
-        while idx < len(records):
-            chunk_records = []
-            chunk_offsets = []
-            off = 18  # internal offset inside carto payload
-
-            while idx < len(records) and len(chunk_records) < MAX_CARTO_RECORDS:
-                way_id, coords = records[idx]
-                chunk_records.append((way_id, coords))
-
-                size = 6 + len(coords) * 8
-                chunk_offsets.append((way_id, off))
-                off += size
-                idx += 1
-
-            if chunk_records:
-                record_chunks.append(chunk_records)
-                offset_chunks.append(chunk_offsets)
-
-        nodes, segments = build_routing_graph_from_roads_df(roads_df)
-        scale_shift = choose_scale_shift_for_nodes(nodes)
-
-        map_file = work / f"{stem}1.SDL"
-        parcel_builders: list[ParcelBuilder] = []
-
-        # CARTO + BTREE
-        for chunk_records, chunk_offsets in zip(record_chunks, offset_chunks):
-
-            def make_carto_parcel(offset_units: int,
-                                  _records=chunk_records,
-                                  _rect=region_rect_ntu):
-                return encode_cartography(
-                    PIDS.CARTO,
-                    _records,
-                    offset_units=offset_units,
-                    rect_ntu=_rect,
-                    compress_type=NO_COMPRESSION,
-                )
-
-            def make_btree_parcel(offset_units: int,
-                                  _offsets=chunk_offsets):
-                return encode_btree(
-                    PIDS.BTREE,
-                    _offsets,
-                    offset_units=offset_units,
-                    compress_type=NO_COMPRESSION,
-                )
-
-            parcel_builders.append(
-                ParcelBuilder(
-                    pid=PIDS.CARTO,
-                    layer_type=0,
-                    make=make_carto_parcel,
-                    rect=region_rect_ntu,
-                    scale_min=0,
-                    scale_max=0xFFFF,
-                )
-            )
-            parcel_builders.append(
-                ParcelBuilder(
-                    pid=PIDS.BTREE,
-                    layer_type=2,
-                    make=make_btree_parcel,
-                    rect=region_rect_ntu,
-                    scale_min=0,
-                    scale_max=0xFFFF,
-                )
-            )
-
-        # ROUTING (chunked)
-        MAX_ROUTING_CHUNK = 1000  # ~20-30KB payload per chunk
-        for i in range(0, len(nodes), MAX_ROUTING_CHUNK):
-            n_chunk = nodes[i:i + MAX_ROUTING_CHUNK]
-            s_chunk = segments[i:i + MAX_ROUTING_CHUNK] if i < len(segments) else []
-
-            def make_routing_parcel(offset_units: int,
-                                    _nodes=n_chunk,
-                                    _segments=s_chunk,
-                                    _scale_shift=scale_shift,
-                                    _rect=region_rect_ntu):
-                return encode_routing_parcel(
-                    pid=PIDS.ROUTING,
-                    nodes=_nodes,
-                    segments=_segments,
-                    region=1,
-                    parcel_type=0,
-                    parcel_desc=0x02,
-                    offset_units=offset_units,
-                    rect_ntu=_rect,
-                    scale_shift=_scale_shift,
-                    size_index=0,
-                    compress_type=NO_COMPRESSION,
-                )
-
-            parcel_builders.append(
-                ParcelBuilder(
-                    pid=PIDS.ROUTING,
-                    layer_type=1,
-                    make=make_routing_parcel,
-                    rect=region_rect_ntu,
-                    scale_min=0,
-                    scale_max=0xFFFF,
-                )
-            )
-
-        build_region_sdl_file(
-            format_mode,
-            map_file,
-            db_id=db_id,
-            sdl_name=map_file.name,
-            parcel_builders=parcel_builders,
-            topology_entries=topology_entries,
-            pids=PIDS,
-        )
-        region_files.extend([fast_file, map_file])
+    for _, files, entries in region_results:
+        region_files.extend(files)
+        topology_entries.extend(entries)
+    del region_results
 
     # -------------------------------------------------------------------------
     # 7. CARTOTOP.SDL + REGION.SDL / REGIONS.SDL + INIT.SDL + MTOC.SDL
     # -------------------------------------------------------------------------
     cartotop_path = work / "CARTOTOP.SDL"
-    write_cartotop_sdl(cartotop_path, topology_entries, pid_cartotop=PIDS.CARTOTOP)
-    global_files.append(cartotop_path)
-
     region_sdl = work / "REGION.SDL"
     regions_sdl = work / "REGIONS.SDL"
     mtoc_sdl = work / "MTOC.SDL"
 
-    write_region_sdl(region_sdl, regions, supp_lang, countries)
-    write_regions_sdl(regions_sdl, regions, supp_lang, countries)
-
+    global_files.append(cartotop_path)
     sdl_for_control = global_files + region_files + [region_sdl, regions_sdl]
 
     # INIT.SDL (OEM) or 0.SDL (SDAL std)
     init_filename = "0.SDL" if format_mode == "SDAL" else "INIT.SDL"
     init_path = work / init_filename
-
-    if format_mode == "SDAL":
-        write_init_sdl_standard(init_path, sdl_for_control, regions, supp_lang, pids=PIDS)
-    else:
-        write_oem_init_sdl(init_path, sdl_for_control, regions, supp_lang)
-
     all_for_mtoc = sdl_for_control + [init_path]
-    write_mtoc_sdl(mtoc_sdl, all_for_mtoc)
+
+    # Writers only need file names, not contents of each other's output,
+    # so they run side by side (zlib.crc32 and file I/O release the GIL).
+    with ThreadPoolExecutor(max_workers=4) as pool:
+        futures = [
+            pool.submit(write_cartotop_sdl, cartotop_path, topology_entries,
+                        pid_cartotop=PIDS.CARTOTOP),
+            pool.submit(write_region_sdl, region_sdl, regions, supp_lang, countries),
+            pool.submit(write_regions_sdl, regions_sdl, regions, supp_lang, countries),
+            pool.submit(write_mtoc_sdl, mtoc_sdl, all_for_mtoc),
+        ]
+        if format_mode == "SDAL":
+            futures.append(pool.submit(write_init_sdl_standard, init_path,
+                                       sdl_for_control, regions, supp_lang, pids=PIDS))
+        else:
+            futures.append(pool.submit(write_oem_init_sdl, init_path,
+                                       sdl_for_control, regions, supp_lang))
+        for fut in futures:
+            fut.result()
 
     # -------------------------------------------------------------------------
     # 8. BUILD ISO
@@ -2,9 +2,10 @@
 from __future__ import annotations
 
 import struct
-import io
 from dataclasses import dataclass, field
-from typing import List, Tuple, Any, Optional
+from typing import List, NamedTuple, Tuple, Any, Optional, Sequence, Union
+
+import numpy as np
 
 # ИСПРАВЛЕНИЕ: Убрали ROUTING_PARCEL_ID из импорта, так как он теперь динамический
 from .constants import NO_COMPRESSION
@@ -37,76 +38,94 @@ def deg_to_ntu(lat_deg: float, lon_deg: float) -> Tuple[int, int]:
     return clamp_32(lat_ntu), clamp_32(lon_ntu)
 
 
+def deg_to_ntu_arr(lat_deg: np.ndarray, lon_deg: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Array version of deg_to_ntu(): same round-half-even and int32 clamping.
+    """
+    def to_ntu(v) -> np.ndarray:
+        ntu = np.rint(np.asarray(v, dtype=np.float64) * NTU_PER_DEG)
+        return np.clip(ntu, -0x80000000, 0x7FFFFFFF).astype(np.int32)
+
+    return to_ntu(lat_deg), to_ntu(lon_deg)
+
+
 # ────────────────────────────────────────────────────────────────
 # Variable Length Value (VLV) Encoding (Type 1, 4, 5)
 # ────────────────────────────────────────────────────────────────
 
-class BitStream:
-    """Helper for bit-level writing (essential for Type 5 VLV)."""
-    def __init__(self):
-        self.buffer = bytearray()
-        self.bit_count = 0
+VLV1_MAX = 0x1FFFFFFF  # 29 value bits in the 4-byte Type 1 form
 
-    def write_bits(self, value: int, num_bits: int):
-        if num_bits == 0:
-            return
-        
-        while num_bits > 0:
-            bits_to_write = min(8 - self.bit_count, num_bits)
-            shift = num_bits - bits_to_write
-            
-            mask = (1 << bits_to_write) - 1
-            segment = (value >> shift) & mask
-            
-            if self.bit_count == 0:
-                self.buffer.append(0)
-            
-            # Записываем сегмент в текущий байт
-            self.buffer[-1] |= segment << (8 - self.bit_count - bits_to_write)
-            
-            self.bit_count += bits_to_write
-            num_bits -= bits_to_write
-            
-            if self.bit_count == 8:
-                self.bit_count = 0
-
-    def finalize(self) -> bytes:
-        if self.bit_count > 0:
-            pass
-        return bytes(self.buffer)
-
-def encode_vlv_type1(value: int) -> bytes:
-    """Type 1: 1-4 bytes, unsigned. 0xxxxxxx (1 byte), 10xxxxxx xxxxxxxx (2 bytes), etc."""
-    if value < 0x80:
-        return struct.pack(">B", value)
-    elif value < 0x4000:
-        return struct.pack(">H", value | 0x8000)
-    elif value < 0x200000:
-        data = value | 0xC00000
-        return struct.pack(">I", data)[1:] 
-    else:
-        return struct.pack(">I", value | 0xE0000000)
-
-def encode_vlv_type5_signed(value: int, bs: BitStream, bit_length: int = 19):
+def encode_vlv_type1_arr(values: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Type 1: 1-4 bytes, unsigned. 0xxxxxxx (1 byte), 10xxxxxx xxxxxxxx (2 bytes), etc.
+    Every code comes back as 4 big-endian bytes (right-aligned, shape (n, 4))
+    plus its length in bytes (1-4).
+    """
+    v = np.asarray(values, dtype=np.int64)
+    if v.size and (v.min() < 0 or v.max() > VLV1_MAX):
+        raise ValueError(f"Type 1 VLV values must be 0 to {VLV1_MAX:#x}.")
+    small = [v < 0x80, v < 0x4000, v < 0x200000]
+    lengths = np.select(small, [1, 2, 3], 4)
+    prefix = np.select(small, [0, 0x8000, 0xC00000], 0xE0000000)
+    codes = (v | prefix).astype(">u4").view(np.uint8).reshape(-1, 4)
+    return codes, lengths
+
+
+def encode_vlv_type5_signed_arr(values: np.ndarray, bit_length: int = 19) -> np.ndarray:
     """
     Type 5: Variable Length Signed Value (19-bit assumed for deltas).
-    Кодирует знак (1 бит) + Magnitude (bit_length - 1 бит).
+    Sign bit + magnitude (saturated at bit_length - 1 bits), as
+    *bit_length*-bit integers ready to be packed MSB-first.
     """
     if bit_length < 7 or bit_length > 19:
         raise ValueError("Type 5 VLV must be 7 to 19 bits.")
-        
-    sign_bit = 1 if value < 0 else 0
-    magnitude = abs(value)
-    
-    # 1. Write Sign Bit (1 бит)
-    bs.write_bits(sign_bit, 1)
-    
-    # 2. Write Magnitude (bit_length - 1 бит)
+    v = np.asarray(values, dtype=np.int64)
     mag_bits = bit_length - 1
-    if magnitude >= (1 << mag_bits):
-        magnitude = (1 << mag_bits) - 1
-    
-    bs.write_bits(magnitude, mag_bits)
+    magnitude = np.minimum(np.abs(v), (1 << mag_bits) - 1)
+    return ((v < 0).astype(np.int64) << mag_bits) | magnitude
+
+
+class _BlockLayout(NamedTuple):
+    """
+    A data block laid out as *head* bytes, records made of variable-length
+    fields, then *tail* bytes. Each field is (codes, lengths): right-aligned
+    bytes of shape (n, k) and the number of trailing bytes of each row that
+    belong to the record.
+
+    The size is known before anything is written, so a block can be placed
+    straight into a larger buffer.
+    """
+    head: bytes
+    fields: Sequence[Tuple[np.ndarray, np.ndarray]]
+    tail: bytes = b""
+
+    @property
+    def size(self) -> int:
+        return (len(self.head) + len(self.tail)
+                + int(sum(int(lengths.sum()) for _, lengths in self.fields)))
+
+    def write_into(self, out: np.ndarray, start: int = 0) -> int:
+        """Writes the block into uint8 *out* at *start*; returns the end offset."""
+        head, fields, tail = self
+        end = start + self.size
+        out[start:start + len(head)] = np.frombuffer(head, dtype=np.uint8)
+        out[end - len(tail):end] = np.frombuffer(tail, dtype=np.uint8)
+
+        record_len = sum(lengths for _, lengths in fields)
+        pos = np.cumsum(record_len) - record_len + start + len(head)
+        for codes, lengths in fields:
+            k = codes.shape[1]
+            skip = k - lengths
+            for j in range(k):
+                take = j >= skip
+                out[pos[take] + (j - skip[take])] = codes[take, j]
+            pos = pos + lengths
+        return end
+
+    def tobytes(self) -> bytes:
+        out = np.empty(self.size, dtype=np.uint8)
+        self.write_into(out)
+        return out.tobytes()
 
 
 # ────────────────────────────────────────────────────────────────
@@ -120,6 +139,35 @@ class NodeRecord:
     lon_deg: float
     segment_ids: List[int] = field(default_factory=list)
 
+@dataclass
+class NodeTable:
+    """
+    Struct-of-arrays form of a NodeRecord list (node_id, lat_deg, lon_deg).
+    Slicing returns another NodeTable over views of the same columns.
+    """
+    node_id: np.ndarray
+    lat_deg: np.ndarray
+    lon_deg: np.ndarray
+
+    @classmethod
+    def from_records(cls, records: Sequence[NodeRecord]) -> "NodeTable":
+        n = len(records)
+        return cls(
+            node_id=np.fromiter((r.node_id for r in records), dtype=np.int64, count=n),
+            lat_deg=np.fromiter((r.lat_deg for r in records), dtype=np.float64, count=n),
+            lon_deg=np.fromiter((r.lon_deg for r in records), dtype=np.float64, count=n),
+        )
+
+    def __len__(self) -> int:
+        return len(self.node_id)
+
+    def __getitem__(self, idx: Union[slice, np.ndarray]) -> "NodeTable":
+        return NodeTable(
+            node_id=self.node_id[idx],
+            lat_deg=self.lat_deg[idx],
+            lon_deg=self.lon_deg[idx],
+        )
+
 @dataclass
 class SegmentRecord:
     seg_id: int
@@ -130,86 +178,147 @@ class SegmentRecord:
     oneway: int
 
 
+@dataclass
+class SegmentTable:
+    """
+    Struct-of-arrays form of a SegmentRecord list (one numpy column per field).
+    Slicing returns another SegmentTable over views of the same columns;
+    an index array returns a reordered copy.
+    """
+    seg_id: np.ndarray
+    from_node_id: np.ndarray
+    to_node_id: np.ndarray
+    length_m: np.ndarray
+    speed_class: np.ndarray
+    oneway: np.ndarray
+
+    @classmethod
+    def from_records(cls, records: Sequence[SegmentRecord]) -> "SegmentTable":
+        return cls(
+            seg_id=np.array([r.seg_id for r in records], dtype=np.int64),
+            from_node_id=np.array([r.from_node_id for r in records], dtype=np.int64),
+            to_node_id=np.array([r.to_node_id for r in records], dtype=np.int64),
+            length_m=np.array([r.length_m for r in records], dtype=np.float64),
+            speed_class=np.array([r.speed_class for r in records], dtype=np.uint8),
+            oneway=np.array([r.oneway for r in records], dtype=np.uint8),
+        )
+
+    def __len__(self) -> int:
+        return len(self.seg_id)
+
+    def __getitem__(self, idx: Union[slice, np.ndarray]) -> "SegmentTable":
+        return SegmentTable(
+            seg_id=self.seg_id[idx],
+            from_node_id=self.from_node_id[idx],
+            to_node_id=self.to_node_id[idx],
+            length_m=self.length_m[idx],
+            speed_class=self.speed_class[idx],
+            oneway=self.oneway[idx],
+        )
+
+
+def segments_by_from_node(segments: SegmentTable,
+                          node_count: int) -> Tuple[SegmentTable, np.ndarray]:
+    """
+    Reorders segments by from_node_id (seg_id order within a node) and returns
+    CSR offsets alongside: the segments leaving nodes [a, b) are
+    table[offsets[a]:offsets[b]], so node chunks slice their segments in O(1).
+    """
+    order = np.lexsort((segments.seg_id, segments.from_node_id))
+    offsets = np.zeros(node_count + 1, dtype=np.int64)
+    np.cumsum(np.bincount(segments.from_node_id, minlength=node_count), out=offsets[1:])
+    return segments[order], offsets
+
+
 # ────────────────────────────────────────────────────────────────
 # Encoding Blocks (SDAL 1.7 Compliant BRPPD Simulation)
 # ────────────────────────────────────────────────────────────────
 
+_BLKDESC_STRUCT = struct.Struct(">HI")
+
+
 def _encode_block_descriptor(block_type: int, entry_count: int) -> bytes:
     """
     BlkDesc_t / BlkDesc2_t: usBlkId (H), ulEntryCount (I).
     """
-    return struct.pack(">HI", block_type, entry_count)
+    return _BLKDESC_STRUCT.pack(block_type, entry_count)
 
 
-def encode_nodes_block(
-    nodes: List[NodeRecord],
+def _nodes_block_layout(
+    nodes: Union[NodeTable, List[NodeRecord]],
     rect_ntu: Tuple[int, int, int, int],
-    scale_shift: int,
-) -> bytes:
+) -> Optional[_BlockLayout]:
     """
-    Encodes Node Data Block simulating BRPPD, preceded by BlkDesc.
+    Layout of the Node Data Block (None when there are no nodes).
     """
-    
-    if not nodes:
-        return b""
+    if not len(nodes):
+        return None
+    if not isinstance(nodes, NodeTable):
+        nodes = NodeTable.from_records(nodes)
         
     min_lat_ntu, _, min_lon_ntu, _ = rect_ntu
     
     # Block Header
     header = _encode_block_descriptor(block_type=0x0100, entry_count=len(nodes)) # 0x0100 for Node Data
-    
-    current_lat = min_lat_ntu
-    current_lon = min_lon_ntu
-    
-    data_buffer = io.BytesIO()
-    
-    bs = BitStream()
 
-    for n in nodes:
-        lat_ntu, lon_ntu = deg_to_ntu(n.lat_deg, n.lon_deg)
-        
-        # 1. Node ID (VLV Type 1: 1-4 bytes)
-        data_buffer.write(encode_vlv_type1(n.node_id))
-        
-        # 2. Delta Lon/Lat (VLV Type 5: 19-bit)
-        delta_lat = lat_ntu - current_lat
-        delta_lon = lon_ntu - current_lon
+    node_ids = nodes.node_id
+    lat_ntu, lon_ntu = deg_to_ntu_arr(nodes.lat_deg, nodes.lon_deg)
 
-        encode_vlv_type5_signed(delta_lon, bs, 19) 
-        encode_vlv_type5_signed(delta_lat, bs, 19)
-        
-        current_lat = lat_ntu
-        current_lon = lon_ntu
-    
-    data_buffer.write(bs.finalize())
-    
-    return header + data_buffer.getvalue()
+    # 2. Delta Lon/Lat (VLV Type 5: 19-bit), chained from the rect origin,
+    #    packed MSB-first as one bit stream (zero-padded last byte)
+    delta_lat = np.diff(lat_ntu.astype(np.int64), prepend=min_lat_ntu)
+    delta_lon = np.diff(lon_ntu.astype(np.int64), prepend=min_lon_ntu)
+    pairs = ((encode_vlv_type5_signed_arr(delta_lon, 19) << 19)
+             | encode_vlv_type5_signed_arr(delta_lat, 19))
+    bits = (pairs[:, None] >> np.arange(37, -1, -1)) & 1
+    bit_stream = np.packbits(bits.astype(np.uint8).ravel())
+
+    # 1. Node IDs (VLV Type 1: 1-4 bytes each), between header and bit stream
+    return _BlockLayout(header, [encode_vlv_type1_arr(node_ids)], bit_stream)
 
 
-def encode_segments_block(segments: List[SegmentRecord]) -> bytes:
+def encode_nodes_block(
+    nodes: Union[NodeTable, List[NodeRecord]],
+    rect_ntu: Tuple[int, int, int, int],
+    scale_shift: int,
+) -> bytes:
     """
-    Encodes Segment Data Block using Type 1 VLV, preceded by BlkDesc.
+    Encodes Node Data Block simulating BRPPD, preceded by BlkDesc.
     """
-    if not segments:
-        return b""
+    layout = _nodes_block_layout(nodes, rect_ntu)
+    return layout.tobytes() if layout else b""
+
+
+def _segments_block_layout(
+    segments: Union[SegmentTable, List[SegmentRecord]],
+) -> Optional[_BlockLayout]:
+    """
+    Layout of the Segment Data Block (None when there are no segments).
+    """
+    if not len(segments):
+        return None
+    if not isinstance(segments, SegmentTable):
+        segments = SegmentTable.from_records(segments)
         
     # Block Header
     header = _encode_block_descriptor(block_type=0x0200, entry_count=len(segments)) # 0x0200 for Segment Data
-    
-    data_buffer = io.BytesIO()
 
-    for s in segments:
-        # 1. Segment ID (VLV Type 1)
-        data_buffer.write(encode_vlv_type1(s.seg_id))
-        
-        # 2. From/To Node ID (VLV Type 1)
-        data_buffer.write(encode_vlv_type1(s.from_node_id))
-        data_buffer.write(encode_vlv_type1(s.to_node_id))
-        
-        # 3. Attributes (Length)
-        data_buffer.write(struct.pack(">f", s.length_m))
-        
-    return header + data_buffer.getvalue()
+    # Per segment: Segment ID, From/To Node ID (VLV Type 1), then length (>f)
+    length_codes = segments.length_m.astype(">f4").view(np.uint8).reshape(-1, 4)
+    return _BlockLayout(header, [
+        encode_vlv_type1_arr(segments.seg_id),
+        encode_vlv_type1_arr(segments.from_node_id),
+        encode_vlv_type1_arr(segments.to_node_id),
+        (length_codes, np.full(len(segments), 4)),
+    ])
+
+
+def encode_segments_block(segments: Union[SegmentTable, List[SegmentRecord]]) -> bytes:
+    """
+    Encodes Segment Data Block using Type 1 VLV, preceded by BlkDesc.
+    """
+    layout = _segments_block_layout(segments)
+    return layout.tobytes() if layout else b""
 
 
 # ────────────────────────────────────────────────────────────────
@@ -224,7 +333,8 @@ def _encode_routing_header_0(node_count: int, seg_count: int) -> bytes:
     """
     Encodes RoutingParcelHeader0_t (32 bytes).
     """
-    args = (
+    # Only the two counts vary: one straight-line pack, no argument tuple
+    return _ROUTING_HDR0_STRUCT.pack(
         0xFFFF,     # 1. usMaxArmToArm (H)
         seg_count,  # 2. ulTotalSegs (I)
         0xFF,       # 3. ucMaxSegsPerNode (B) - было 'b', стало 'B' для 0xFF
@@ -242,21 +352,18 @@ def _encode_routing_header_0(node_count: int, seg_count: int) -> bytes:
         0x00000000  # 16. Padding part 2 (I - 4 bytes)
     )
 
-    return _ROUTING_HDR0_STRUCT.pack(*args)
-
 # ────────────────────────────────────────────────────────────────
 # Block Offset Array (BOA)
 # ────────────────────────────────────────────────────────────────
+_BOA_STRUCT = struct.Struct(">IIII")
+
+
 def _encode_block_offset_array(node_data_offset: int, seg_data_offset: int) -> bytes:
     """
     Encodes the Block Offset Array (4 x Ulong, 16 bytes).
     Offsets are relative to the start of this array.
     """
-    return struct.pack(">IIII",
-                       node_data_offset, 
-                       seg_data_offset,  
-                       0,               
-                       0)                
+    return _BOA_STRUCT.pack(node_data_offset, seg_data_offset, 0, 0)                
 
 
 # ────────────────────────────────────────────────────────────────
@@ -288,29 +395,26 @@ def _encode_spatial_parcel_header_prefix(
     """
     min_lat, max_lat, min_lon, max_lon = rect_ntu
 
-    # 1. DBRect'ы (3 раза)
-    dbrect_args = (min_lon, min_lat, max_lon, max_lat) * 3
-    
-    # 2. XrfPclHdr_t (заглушка, 20 байт)
-    xrf_args = (0, 0, 0, 0) 
-    
-    # 3. KD/B-Tree Offsets (16 x ushort, заглушка, 32 байта)
-    kd_btree_offsets = (0,) * 16
-    
-    # 4. Scale/Layer/NodeCount/SegCount
-    rest_args = (scale_shift, 1, 0, node_count, seg_count)
-    
-    # 5. Padding (4 x Ulong, 16 bytes)
-    padding_args = (0,) * 4
-
-    args = dbrect_args + xrf_args + kd_btree_offsets + rest_args + padding_args
-    
-    return _SPTL_HDR_STRUCT.pack(*args)
+    # Straight-line pack: only the rect, scale and counts vary per parcel
+    return _SPTL_HDR_STRUCT.pack(
+        # 1. DBRect'ы (3 раза)
+        min_lon, min_lat, max_lon, max_lat,
+        min_lon, min_lat, max_lon, max_lat,
+        min_lon, min_lat, max_lon, max_lat,
+        # 2. XrfPclHdr_t (заглушка, 20 байт)
+        0, 0, 0, 0,
+        # 3. KD/B-Tree Offsets (16 x ushort, заглушка, 32 байта)
+        0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0,
+        # 4. Scale/Layer/NodeCount/SegCount
+        scale_shift, 1, 0, node_count, seg_count,
+        # 5. Padding (4 x Ulong, 16 bytes)
+        0, 0, 0, 0,
+    )
 
 
 def encode_routing_parcel(pid: int, 
-                          nodes: List[NodeRecord], 
-                          segments: List[SegmentRecord], 
+                          nodes: Union[NodeTable, List[NodeRecord]], 
+                          segments: Union[SegmentTable, List[SegmentRecord]], 
                           region: int,
                           parcel_type: int, 
                           parcel_desc: int, 
@@ -318,22 +422,24 @@ def encode_routing_parcel(pid: int,
                           rect_ntu: Tuple[int, int, int, int], 
                           scale_shift: int,
                           compress_type: int = NO_COMPRESSION,
-                          size_index: int = 0) -> bytes:
+                          size_index: int = 0) -> bytearray:
     """
     Encodes a full Routing Parcel, используя SptlPclHdr_t, RoutingParcelHeader0_t, BOA и Блоки.
     """
-    from .encoder import encode_bytes 
-    
-    # 1. Encode Data Blocks (Node & Segment Data + BlkDesc)
-    nodes_block = encode_nodes_block(nodes, rect_ntu, scale_shift)
-    segments_block = encode_segments_block(segments)
+    from .encoder import encode_parcel_header
+
+    # 1. Lay out Data Blocks (Node & Segment Data + BlkDesc); written later
+    nodes_layout = _nodes_block_layout(nodes, rect_ntu)
+    segments_layout = _segments_block_layout(segments)
+    blocks = [layout for layout in (nodes_layout, segments_layout) if layout]
+    nodes_block_size = nodes_layout.size if nodes_layout else 0
     
     # 2. Calculate offsets for BOA
     # BOA начинается сразу после Routing Header 0. 
     node_data_offset_from_boa = BLOCK_OFFSET_ARRAY_SIZE
     
     # Segment Block начинается после Node Block.
-    seg_data_offset_from_boa = node_data_offset_from_boa + len(nodes_block)
+    seg_data_offset_from_boa = node_data_offset_from_boa + nodes_block_size
     
     # 3. Construct Headers and BOA
     spatial_header = _encode_spatial_parcel_header_prefix(
@@ -350,24 +456,34 @@ def encode_routing_parcel(pid: int,
         seg_data_offset_from_boa
     )
 
-    # 4. Combine Payload (SptlHdr + RoutingHdr0 + BOA + Data Blocks)
-    raw_payload = (
-        spatial_header + 
-        routing_header_0 + 
-        block_offset_array + 
-        nodes_block + 
-        segments_block
-    )
-    
-    # 5. Wrap in standard PclHdr_t
+    # 4. PclHdr_t + SptlHdr + RoutingHdr0 + BOA + Data Blocks.
+    # Размеры известны заранее, поэтому всё (и сами блоки) пишется в один
+    # буфер без промежуточных bytes.
+    headers = (spatial_header, routing_header_0, block_offset_array)
+    payload_len = sum(map(len, headers)) + sum(layout.size for layout in blocks)
+
     # ИСПРАВЛЕНИЕ: Используем pid, переданный как аргумент, а не удаленную константу
-    return encode_bytes(
-        pid=pid, 
-        payload=raw_payload,
+    parcel_header = encode_parcel_header(
+        pid,
+        payload_len,
         region=region,
         parcel_type=parcel_type,
         parcel_desc=parcel_desc,
         offset_units=offset_units,
         compress_type=compress_type,
         size_index=size_index
-    )
\ No newline at end of file
+    )
+
+    buf = bytearray(len(parcel_header) + payload_len)
+    pos = len(parcel_header)
+    buf[:pos] = parcel_header
+    for section in headers:
+        end = pos + len(section)
+        buf[pos:end] = section
+        pos = end
+
+    out = np.frombuffer(buf, dtype=np.uint8)
+    for layout in blocks:
+        pos = layout.write_into(out, pos)
+    del out  # release the export so buf stays an ordinary bytearray
+    return buf
\ No newline at end of file
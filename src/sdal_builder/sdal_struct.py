@@ -2,6 +2,8 @@
 from __future__ import annotations
 import struct
 
+import numpy as np
+
 # --------------------------------------------------------------------------- #
 # SDAL 1.7 Big-Endian Struct Definitions
 # --------------------------------------------------------------------------- #
@@ -13,6 +15,8 @@ UINT64 = struct.Struct(">Q")
 
 # KD-Tree Node Payload (uint32 index, int32 lon, int32 lat)
 KDTREE_NODE_STRUCT = struct.Struct(">Iii")
+# Same layout as a numpy record, for serialising all nodes at once
+KDTREE_NODE_DTYPE = np.dtype([("idx", ">u4"), ("x", ">i4"), ("y", ">i4")])
 
 
 def pack_uint64(value: int) -> bytes:
@@ -1,13 +1,15 @@
 # src/sdal_builder/spatial.py
 from __future__ import annotations
 
+import os
 from typing import Iterable, Tuple, List
 
+import numpy as np
 from scipy.spatial import cKDTree
 import bplustree
 
 # ИМПОРТ ЦЕНТРАЛИЗОВАННЫХ СТРУКТУР (Big-Endian)
-from .sdal_struct import KDTREE_NODE_STRUCT, pack_uint64, UINT32
+from .sdal_struct import KDTREE_NODE_DTYPE, pack_uint64, UINT32
 
 # --------------------------------------------------------------------------- #
 # KD-tree helpers                                                             #
@@ -15,9 +17,13 @@ from .sdal_struct import KDTREE_NODE_STRUCT, pack_uint64, UINT32
 
 def build_kdtree(points: List[Tuple[float, float]]) -> cKDTree:
     """
-    Return a KD-tree built from *points* = [(x, y), …].
+    Return a KD-tree built from *points* = [(x, y), …] (or an (N, 2) array).
+
+    Uses sliding-midpoint splits without shrinking node boxes, which builds
+    several times faster than the balanced median default on large inputs;
+    queries stay correct and kd.data keeps the input order either way.
     """
-    return cKDTree(points)
+    return cKDTree(points, balanced_tree=False, compact_nodes=False)
 
 def serialize_kdtree(kd: cKDTree) -> bytes:
     """
@@ -27,19 +33,17 @@ def serialize_kdtree(kd: cKDTree) -> bytes:
     1. Header: uint32 (Total number of POI nodes)
     2. Nodes: sequence of <uint32 idx><int32 x*1e6><int32 y*1e6>
     """
-    buf = bytearray()
-    
-    poi_count = len(kd.data)
-    
-    # 1. Header: POI Count (uint32, Big-Endian)
-    buf.extend(UINT32.pack(poi_count)) 
+    data = np.asarray(kd.data)
+    poi_count = len(data)
 
-    # 2. Nodes data
-    for idx, (x, y) in enumerate(kd.data):
-        # ИСПОЛЬЗУЕМ ЦЕНТРАЛИЗОВАННУЮ СТРУКТУРУ KDTREE_NODE_STRUCT (Big-Endian)
-        buf.extend(KDTREE_NODE_STRUCT.pack(idx, int(x * 1e6), int(y * 1e6))) 
+    # Nodes data, filled column-wise (int() truncation, as before)
+    nodes = np.empty(poi_count, dtype=KDTREE_NODE_DTYPE)
+    nodes["idx"] = np.arange(poi_count)
+    nodes["x"] = (data[:, 0] * 1e6).astype(np.int32)
+    nodes["y"] = (data[:, 1] * 1e6).astype(np.int32)
 
-    return bytes(buf)
+    # Header: POI Count (uint32, Big-Endian), then the nodes
+    return UINT32.pack(poi_count) + nodes.tobytes()
 
 # --------------------------------------------------------------------------- #
 # B+-tree helpers                                                             #
@@ -49,8 +53,29 @@ def build_bplustree(offsets: Iterable[Tuple[int, int]], path: str) -> None:
     """
     Build an on-disk B+-tree mapping *way_id* (uint32 int) ➜ *offset* (uint64).
     """
+    pairs = np.array(list(offsets), dtype=np.uint64).reshape(-1, 2)
+    keys = pairs[:, 0]
+
+    # Sorted, one entry per way_id (the last one wins, as with tree[k] = v)
+    order = np.argsort(keys, kind="stable")
+    sorted_keys = keys[order]
+    is_last = np.append(sorted_keys[1:] != sorted_keys[:-1], True)[:len(keys)]
+    order = order[is_last]
+    # Big-Endian uint64 values, as pack_uint64 produces
+    values = pairs[order, 1].astype(">u8").tobytes()
+
+    is_new = not os.path.exists(path) or os.path.getsize(path) == 0
     tree = bplustree.BPlusTree(path, key_size=4, value_size=8, order=50)
-    for way_id, offset in offsets:
-        # ИСПОЛЬЗУЕМ ЦЕНТРАЛИЗОВАННЫЙ УПАКОВЩИК UINT64 (Big-Endian)
-        tree[way_id] = pack_uint64(offset)
-    tree.close()
\ No newline at end of file
+    try:
+        if is_new:
+            # Пустое дерево: bulk-load одним транзакционным проходом
+            tree.batch_insert(
+                (key, values[i * 8:(i + 1) * 8])
+                for i, key in enumerate(keys[order].tolist())
+            )
+        else:
+            # ИСПОЛЬЗУЕМ ЦЕНТРАЛИЗОВАННЫЙ УПАКОВЩИК UINT64 (Big-Endian)
+            for way_id, offset in zip(keys[order].tolist(), pairs[order, 1].tolist()):
+                tree[way_id] = pack_uint64(offset)
+    finally:
+        tree.close()
\ No newline at end of file
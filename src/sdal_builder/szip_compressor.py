@@ -1,6 +1,8 @@
 import struct
 import heapq
-from collections import defaultdict
+from bisect import bisect_right
+
+import numpy as np
 from typing import List, Dict, Tuple, NamedTuple, Literal
 
 # ==============================================================================
@@ -11,8 +13,11 @@ from typing import List, Dict, Tuple, NamedTuple, Literal
 class LZ77Constants:
     """Constants for the LZ77 matching phase."""
     WINDOW_SIZE = 32768  # 2^15 bytes lookback buffer size
+    WINDOW_MASK = WINDOW_SIZE - 1
     MAX_MATCH_LENGTH = 258
     MIN_MATCH_LENGTH = 3
+    HASH_SIZE = 1 << 16  # 3-byte prefix hash table size
+    MAX_CHAIN = 4096     # Max hash-chain candidates per position (zlib "max" level)
 
 # --- HUFFMAN ENCODING CONSTANTS ---
 MAX_BITS = 15  # Maximum allowed codelength (standard for Deflate/SZIP)
@@ -23,6 +28,7 @@ RLE_LITERAL_CODES = 19 # Alphabet size for encoding code lengths (0-18)
 FIRST_LENGTH_CODE = 257 
 MAX_LENGTH_CODE = 285 
 TOTAL_LIT_LEN_SYMBOLS = 286 # 256 (Lit) + 1 (EOD) + 29 (Len Codes)
+LENGTH_CODE_COUNT = MAX_LENGTH_CODE - FIRST_LENGTH_CODE + 1 # Length tree symbols (code - 257)
 
 # --- STATIC LENGTH AND DISTANCE ENCODING TABLES (DEFLATE-LIKE) ---
 # ⚠️ WARNING: These tables must be verified against the precise SDAL 1.7 spec!
@@ -45,6 +51,15 @@ DISTANCE_MAP = [
     (32767, 13) # 29 codes covering up to 32768
 ]
 
+# Base/extra-bits columns of the maps above, for bisect / np.searchsorted lookups.
+# Диапазоны смежные: base[i] + (1 << bits[i]) == base[i + 1].
+LENGTH_BASES = np.array([b for b, _ in LENGTH_MAP], dtype=np.int32)
+LENGTH_EXTRA_BITS = np.array([e for _, e in LENGTH_MAP], dtype=np.int32)
+DIST_BASES = np.array([b for b, _ in DISTANCE_MAP], dtype=np.int32)
+DIST_EXTRA_BITS = np.array([e for _, e in DISTANCE_MAP], dtype=np.int32)
+_LENGTH_BASES_LIST = LENGTH_BASES.tolist()
+_DIST_BASES_LIST = DIST_BASES.tolist()
+
 # --- DATA STRUCTURE CLASSES ---
 
 TokenType = Literal["LITERAL", "MATCH"]
@@ -56,75 +71,185 @@ class LZ77Token(NamedTuple):
     length: int | None = None # Length of the matched sequence
     value: int | None = None  # Byte value for LITERAL
 
+# Token kinds in LZ77Tokens.kinds
+TOKEN_LITERAL = 0
+TOKEN_MATCH = 1
+
+class LZ77Tokens(NamedTuple):
+    """
+    LZ77 token stream as parallel arrays (one entry per token):
+    kinds - TOKEN_LITERAL / TOKEN_MATCH, a - literal byte or match length,
+    b - 0 or match offset.
+    """
+    kinds: np.ndarray  # int8
+    a: np.ndarray      # int32
+    b: np.ndarray      # int32
+
+    def __len__(self) -> int:
+        return len(self.kinds)
+
+    def as_tokens(self) -> list[LZ77Token]:
+        """Debug view of the stream as LZ77Token tuples."""
+        return [
+            LZ77Token(type="MATCH", offset=b, length=a) if kind == TOKEN_MATCH
+            else LZ77Token(type="LITERAL", value=a)
+            for kind, a, b in zip(self.kinds.tolist(), self.a.tolist(), self.b.tolist())
+        ]
+
 class HuffmanFrequencies(NamedTuple):
-    """Frequencies for building the three Fast Huffman Trees."""
-    literal_freq: Dict[int, int]
-    length_freq: Dict[int, int]
-    offset_freq: Dict[int, int]
+    """
+    Frequencies for building the three Fast Huffman Trees, as count arrays
+    indexed by tree symbol (length codes 257..285 as 0..28).
+    """
+    literal_freq: np.ndarray
+    length_freq: np.ndarray
+    offset_freq: np.ndarray
 
 class CanonicalCodes(NamedTuple):
     """Result of canonical tree construction."""
     code_lengths: List[int]
     # Symbol -> (Binary Code Value, Code Length in Bits)
     code_map: Dict[int, Tuple[int, int]] 
+    # Same codes as flat arrays indexed by symbol (bit length 0 = no code)
+    code_arr: np.ndarray
+    bitlen_arr: np.ndarray
+
+class HuffmanTrees(NamedTuple):
+    """The three Fast Huffman Trees of one block (built once, shared by all steps)."""
+    lit_codes: CanonicalCodes
+    len_codes: CanonicalCodes
+    off_codes: CanonicalCodes
 
 # ==============================================================================
 # LZ77 TOKENIZATION (STEP 1)
 # ==============================================================================
 
-def find_best_match(data: bytes, current_pos: int) -> tuple[int, int]:
-    """Finds the best (longest) LZ77 match in the lookback window."""
-    start_search = max(0, current_pos - LZ77Constants.WINDOW_SIZE)
-    search_buffer = data[start_search:current_pos]
-    
-    best_offset = 0
-    best_length = 0
-    
-    max_len_to_check = min(LZ77Constants.MAX_MATCH_LENGTH, len(data) - current_pos)
+def _common_prefix_length(data: bytes, a: int, b: int, limit: int) -> int:
+    """
+    Number of equal leading bytes of data[a:] and data[b:], at most *limit*.
 
-    # Iterate backwards through the search buffer
-    for offset_index in range(len(search_buffer) - 1, -1, -1):
-        # Calculate the actual offset (distance from current_pos)
-        current_offset = current_pos - (start_search + offset_index)
-        match_len = 0
-        
-        # Check match length
-        for i in range(1, max_len_to_check + 1):
-            if offset_index + i - 1 < len(search_buffer) and \
-               search_buffer[offset_index + i - 1] == data[current_pos + i - 1]:
-                match_len = i
-            else:
-                break
-        
-        if match_len >= LZ77Constants.MIN_MATCH_LENGTH and match_len > best_length:
-            best_length = match_len
-            best_offset = current_offset
-            
-            if best_length == LZ77Constants.MAX_MATCH_LENGTH:
-                break
+    Окно сравнения растёт удвоением (8, 16, 32, ...), каждое сравнение -
+    memcmp срезов; внутри первого несовпавшего окна первый отличающийся
+    байт находится XOR-ом двух big-endian чисел по bit_length.
+    """
+    lo = 0
+    k = 8
+    while k < limit:
+        if data[a + lo:a + k] != data[b + lo:b + k]:
+            break
+        lo = k
+        k <<= 1
+    else:
+        k = limit
+        if data[a + lo:a + k] == data[b + lo:b + k]:
+            return limit
+    x = int.from_bytes(data[a + lo:a + k], "big") ^ int.from_bytes(data[b + lo:b + k], "big")
+    return k - (x.bit_length() + 7) // 8
+
+
+class _Matcher:
+    """
+    DEFLATE-style hash-chain match finder (zlib longest_match).
+
+    head[h] holds the most recent position whose 3-byte prefix hashes to h,
+    prev[p & WINDOW_MASK] links it to the previous one, so only positions
+    sharing the prefix are visited - nearest first, as the backward window
+    scan did.
+    """
+    def __init__(self, data: bytes, max_chain: int = LZ77Constants.MAX_CHAIN):
+        self.data = data
+        self.max_chain = max_chain
+        self.head = [-1] * LZ77Constants.HASH_SIZE
+        self.prev = [-1] * LZ77Constants.WINDOW_SIZE
+
+    def _hash(self, pos: int) -> int:
+        data = self.data
+        return ((data[pos] << 10) ^ (data[pos + 1] << 5) ^ data[pos + 2]) & 0xFFFF
+
+    def insert(self, pos: int) -> None:
+        """Adds position *pos* to its hash chain (no-op near the end of data)."""
+        if pos + LZ77Constants.MIN_MATCH_LENGTH <= len(self.data):
+            h = self._hash(pos)
+            self.prev[pos & LZ77Constants.WINDOW_MASK] = self.head[h]
+            self.head[h] = pos
+
+    def longest_match(self, current_pos: int) -> tuple[int, int]:
+        """
+        Best (offset, length) for *current_pos* among already inserted positions.
+        A match never runs past current_pos (length <= offset); ties go to the
+        smallest offset.
+        """
+        data = self.data
+        max_len_to_check = min(LZ77Constants.MAX_MATCH_LENGTH, len(data) - current_pos)
+        if max_len_to_check < LZ77Constants.MIN_MATCH_LENGTH:
+            return 0, 0
+
+        window_start = current_pos - LZ77Constants.WINDOW_SIZE
+        prev = self.prev
+        best_offset = 0
+        best_length = 0
+
+        cand = self.head[self._hash(current_pos)]
+        chain = self.max_chain
+        while cand >= window_start and cand >= 0 and chain > 0:
+            chain -= 1
+            offset = current_pos - cand
+            limit = offset if offset < max_len_to_check else max_len_to_check
+            # Кандидат не может быть длиннее лучшего - пропускаем сразу
+            if limit > best_length and data[cand + best_length] == data[current_pos + best_length]:
+                match_len = _common_prefix_length(data, cand, current_pos, limit)
+                if match_len >= LZ77Constants.MIN_MATCH_LENGTH and match_len > best_length:
+                    best_length = match_len
+                    best_offset = offset
+                    if best_length == max_len_to_check:
+                        break
+            cand = prev[cand & LZ77Constants.WINDOW_MASK]
+
+        return best_offset, best_length
 
-    return best_offset, best_length
 
-def lz77_tokenize(data: bytes) -> list[LZ77Token]:
+def find_best_match(data: bytes, current_pos: int) -> tuple[int, int]:
+    """Finds the best (longest) LZ77 match in the lookback window."""
+    matcher = _Matcher(data)
+    for pos in range(max(0, current_pos - LZ77Constants.WINDOW_SIZE), current_pos):
+        matcher.insert(pos)
+    return matcher.longest_match(current_pos)
+
+def lz77_tokenize(data: bytes, max_chain: int = LZ77Constants.MAX_CHAIN) -> LZ77Tokens:
     """Encodes input data into a sequence of LZ77 tokens."""
-    tokens = []
+    kinds = []
+    vals_a = []
+    vals_b = []
     current_pos = 0
     data_len = len(data)
+    matcher = _Matcher(data, max_chain)
 
     while current_pos < data_len:
-        offset, length = find_best_match(data, current_pos)
+        offset, length = matcher.longest_match(current_pos)
         
         if length >= LZ77Constants.MIN_MATCH_LENGTH:
             # Match Token
-            tokens.append(LZ77Token(type="MATCH", offset=offset, length=length))
-            current_pos += length
+            kinds.append(TOKEN_MATCH)
+            vals_a.append(length)
+            vals_b.append(offset)
+            step = length
         else:
             # Literal Token
-            byte_value = data[current_pos]
-            tokens.append(LZ77Token(type="LITERAL", value=byte_value))
-            current_pos += 1
-
-    return tokens
+            kinds.append(TOKEN_LITERAL)
+            vals_a.append(data[current_pos])
+            vals_b.append(0)
+            step = 1
+
+        # Все позиции (и внутри совпадения) остаются кандидатами для следующих
+        for pos in range(current_pos, current_pos + step):
+            matcher.insert(pos)
+        current_pos += step
+
+    return LZ77Tokens(
+        kinds=np.array(kinds, dtype=np.int8),
+        a=np.array(vals_a, dtype=np.int32),
+        b=np.array(vals_b, dtype=np.int32),
+    )
 
 # ==============================================================================
 # FREQUENCY GATHERING AND L/D CODING (STEP 2)
@@ -137,196 +262,207 @@ def get_length_code(length: int) -> tuple[int, int]:
     if length == LZ77Constants.MAX_MATCH_LENGTH:
         # Length 258 is always encoded by MAX_LENGTH_CODE (285) with 0 extra bits
         return (MAX_LENGTH_CODE, 0)
-    
-    # Iterate through the static length codes
-    code = FIRST_LENGTH_CODE
-    for base_len, bits in LENGTH_MAP:
-        # Check if the length falls into the current range
-        if length < base_len + (1 << bits):
-            # Calculate the actual value for the extra bits
-            extra_value = length - base_len
-            return (code, bits) # Return the Huffman Code and number of Extra Bits
-        code += 1
-        
-    raise ValueError(f"Length {length} is out of range.")
+
+    idx = max(bisect_right(_LENGTH_BASES_LIST, length) - 1, 0)
+    if length >= _LENGTH_BASES_LIST[idx] + (1 << LENGTH_MAP[idx][1]):
+        raise ValueError(f"Length {length} is out of range.")
+    return (FIRST_LENGTH_CODE + idx, LENGTH_MAP[idx][1])
 
 
 def get_offset_code(offset: int) -> tuple[int, int]:
     """
     Converts actual offset (D) into (Huffman Base Code, Extra Bits).
     """
-    code = 0
-    for base_dist, bits in DISTANCE_MAP:
-        # Check if the offset falls into the current range
-        if offset < base_dist + (1 << bits):
-            # Calculate the actual value for the extra bits
-            extra_value = offset - base_dist
-            return (code, bits) # Return the Huffman Code and number of Extra Bits
-        code += 1
-        
-    raise ValueError(f"Offset {offset} is out of range.")
+    idx = max(bisect_right(_DIST_BASES_LIST, offset) - 1, 0)
+    if offset >= _DIST_BASES_LIST[idx] + (1 << DISTANCE_MAP[idx][1]):
+        raise ValueError(f"Offset {offset} is out of range.")
+    return (idx, DISTANCE_MAP[idx][1])
+
+
+def get_length_codes(lengths: np.ndarray) -> tuple[np.ndarray, np.ndarray]:
+    """Vectorised get_length_code: (codes, extra bits) for an array of lengths."""
+    idx = np.maximum(np.searchsorted(LENGTH_BASES, lengths, side="right") - 1, 0)
+    codes = FIRST_LENGTH_CODE + idx
+    extra = LENGTH_EXTRA_BITS[idx]
+    is_max = lengths == LZ77Constants.MAX_MATCH_LENGTH
+    codes[is_max] = MAX_LENGTH_CODE
+    extra[is_max] = 0
+    return codes, extra
 
 
-def calculate_huffman_frequencies(tokens: list[LZ77Token]) -> HuffmanFrequencies:
+def get_offset_codes(offsets: np.ndarray) -> tuple[np.ndarray, np.ndarray]:
+    """Vectorised get_offset_code: (codes, extra bits) for an array of offsets."""
+    idx = np.maximum(np.searchsorted(DIST_BASES, offsets, side="right") - 1, 0)
+    return idx, DIST_EXTRA_BITS[idx]
+
+
+def calculate_huffman_frequencies(tokens: LZ77Tokens) -> HuffmanFrequencies:
     """Calculates symbol frequencies for the three Huffman trees."""
-    literal_freq = defaultdict(int)
-    length_freq = defaultdict(int)
-    offset_freq = defaultdict(int)
-
-    for token in tokens:
-        if token.type == "LITERAL":
-            literal_freq[token.value] += 1
-            
-        elif token.type == "MATCH":
-            # 1. Length Code
-            length_code, _ = get_length_code(token.length)
-            length_freq[length_code] += 1
-            
-            # 2. Offset Code
-            offset_code, _ = get_offset_code(token.offset)
-            offset_freq[offset_code] += 1
-            
+    is_match = tokens.kinds == TOKEN_MATCH
+
+    literal_freq = np.bincount(tokens.a[~is_match], minlength=EOD_CODE + 1)
     # Add End-of-Data/Block symbol (mandatory for termination)
-    literal_freq[EOD_CODE] += 1 
+    literal_freq[EOD_CODE] += 1
+
+    length_codes, _ = get_length_codes(tokens.a[is_match])
+    offset_codes, _ = get_offset_codes(tokens.b[is_match])
 
     return HuffmanFrequencies(
-        literal_freq=dict(literal_freq),
-        length_freq=dict(length_freq),
-        offset_freq=dict(offset_freq)
+        literal_freq=literal_freq,
+        length_freq=np.bincount(length_codes - FIRST_LENGTH_CODE, minlength=LENGTH_CODE_COUNT),
+        offset_freq=np.bincount(offset_codes, minlength=len(DISTANCE_MAP) + 1),
     )
 
 # ==============================================================================
 # CANONICAL CODE CONSTRUCTION (STEP 3)
 # ==============================================================================
 
-def _build_initial_lengths(frequencies: Dict[int, int], max_symbols: int) -> List[int]:
+def _as_frequency_array(frequencies: Dict[int, int] | np.ndarray) -> np.ndarray:
+    """Symbol-indexed count array for a {symbol: count} dict (arrays pass through)."""
+    if isinstance(frequencies, np.ndarray):
+        return frequencies
+    freq = np.zeros(max(frequencies, default=-1) + 1, dtype=np.int64)
+    for symbol, count in frequencies.items():
+        freq[symbol] = count
+    return freq
+
+
+def _build_initial_lengths(frequencies: Dict[int, int] | np.ndarray, max_symbols: int) -> List[int]:
     """Builds the initial Huffman tree (using min-heap) and determines code lengths."""
-    # Min-heap stores (frequency, symbol/node)
-    min_heap = [(count, symbol) for symbol, count in frequencies.items() if count > 0]
-    heapq.heapify(min_heap)
-    
-    # Heap for building the tree: (frequency, node_tuple_of_symbols)
-    nodes_heap = [(count, (symbol,)) for count, symbol in min_heap]
+    freq = _as_frequency_array(frequencies)
+    symbols = np.flatnonzero(freq > 0)
+
+    # Heap entries: (frequency, first symbol of the node, node id). Узлы не
+    # пересекаются, поэтому сравнение кортежей символов сводилось к первому
+    # символу - порядок слияний тот же, без склейки кортежей.
+    # Ids 0..n-1 are leaves, merged nodes get n, n+1, ...
+    nodes_heap = list(zip(freq[symbols].tolist(), symbols.tolist(), range(len(symbols))))
     heapq.heapify(nodes_heap)
-    
-    # Dictionary to track lengths for symbols
-    symbol_lengths = {s: 0 for _, s in min_heap}
+    parents = [-1] * max(2 * len(symbols) - 1, 0)
+    next_id = len(symbols)
 
     while len(nodes_heap) > 1:
-        freq1, node1 = heapq.heappop(nodes_heap)
-        freq2, node2 = heapq.heappop(nodes_heap)
-        
-        new_freq = freq1 + freq2
-        new_node = node1 + node2
-        
-        # Increment code length for all symbols in the combined nodes
-        for symbol in node1 + node2:
-             symbol_lengths[symbol] += 1
-            
-        heapq.heappush(nodes_heap, (new_freq, new_node))
-        
-    # Format the result: fill with zeros for unused symbols
-    final_lengths = [0] * max_symbols
-    for symbol, length in symbol_lengths.items():
-        if symbol < max_symbols:
-            final_lengths[symbol] = length
-            
-    return final_lengths
+        freq1, first1, id1 = heapq.heappop(nodes_heap)
+        freq2, _, id2 = heapq.heappop(nodes_heap)
+        parents[id1] = parents[id2] = next_id
+        heapq.heappush(nodes_heap, (freq1 + freq2, first1, next_id))
+        next_id += 1
+
+    # Depth of every node in one pass from the root down (parents have larger ids)
+    depth = [0] * len(parents)
+    for node in range(len(parents) - 2, -1, -1):
+        depth[node] = depth[parents[node]] + 1
+    # A lone symbol still needs a code to be written: give it one bit (as zlib does)
+    if len(depth) == 1:
+        depth[0] = 1
+
+    # Leaves are the first len(symbols) ids; unused symbols stay at 0
+    final_lengths = np.zeros(max_symbols, dtype=np.int64)
+    in_range = symbols < max_symbols
+    final_lengths[symbols[in_range]] = np.array(depth[:len(symbols)], dtype=np.int64)[in_range]
+    return final_lengths.tolist()
 
 def _limit_and_canonicalize_lengths(lengths: List[int], max_bits: int) -> List[int]:
-    """Limits code lengths to MAX_BITS and performs simplified balancing/canonicalization."""
-    # ⚠️ NOTE: This function uses a simplified length limiting. A full ZLIB/DEFLATE
-    # implementation requires a complex iterative balancing algorithm.
-    
-    # Simple length truncation:
-    for i in range(len(lengths)):
-        lengths[i] = min(lengths[i], max_bits)
-        
-    return lengths
+    """
+    Limits code lengths to *max_bits* while keeping the Kraft inequality.
+
+    Over-long codes are clamped to max_bits, which overfills the code space;
+    the per-length counts are then rebalanced (as miniz/zlib do): each step
+    drops one max_bits leaf and splits the deepest shorter leaf into two
+    one level down, until sum(count[l] * 2^(max_bits - l)) == 2^max_bits.
+    The lengths are then handed back to the symbols, longest codes first
+    to the symbols that had the longest (i.e. rarest) codes.
+    """
+    bl_count = [0] * (max_bits + 1)
+    overflow = False
+    for length in lengths:
+        if length > max_bits:
+            overflow = True
+            length = max_bits
+        if length > 0:
+            bl_count[length] += 1
+
+    if not overflow:
+        return lengths
+
+    # Kraft sum in units of 2^-max_bits; каждая итерация уменьшает её на 1
+    total = sum(count << (max_bits - bits) for bits, count in enumerate(bl_count) if bits)
+    while total > (1 << max_bits):
+        bl_count[max_bits] -= 1
+        for bits in range(max_bits - 1, 0, -1):
+            if bl_count[bits]:
+                bl_count[bits] -= 1
+                bl_count[bits + 1] += 2
+                break
+        total -= 1
 
-def _get_canonical_codes_map(lengths: List[int]) -> Dict[int, Tuple[int, int]]:
-    """Generates the Canonical Code map: Symbol -> (Binary Code Value, Length)."""
-    
-    # 1. Sort symbols by length, then by value
-    sorted_symbols = sorted([
-        (length, symbol) for symbol, length in enumerate(lengths) if length > 0
-    ])
+    # Longest original codes get the longest limited codes (ties by symbol)
+    order = sorted((s for s, length in enumerate(lengths) if length > 0),
+                   key=lambda s: -lengths[s])
+    new_lengths = [bits for bits in range(max_bits, 0, -1) for _ in range(bl_count[bits])]
+    for symbol, length in zip(order, new_lengths):
+        lengths[symbol] = length
 
-    if not sorted_symbols:
-        return {}
+    return lengths
 
-    # 2. Calculate the starting code for each length
-    counts = defaultdict(int)
-    for length, _ in sorted_symbols:
-        counts[length] += 1
-        
-    next_code = {}
+def _get_canonical_code_values(lengths: List[int]) -> np.ndarray:
+    """Canonical code value of every symbol (0 for symbols without a code)."""
+    lengths_arr = np.asarray(lengths, dtype=np.int64)
+    code_arr = np.zeros(len(lengths_arr), dtype=np.uint32)
+
+    # 1. Sort symbols by length, then by value
+    symbols = np.flatnonzero(lengths_arr > 0)
+    if not len(symbols):
+        return code_arr
+    symbols = symbols[np.argsort(lengths_arr[symbols], kind="stable")]
+    sorted_lengths = lengths_arr[symbols]
+
+    # 2. Calculate the starting code for each length:
+    #    next_code[L] = (next_code[L-1] + counts[L-1]) << 1
+    counts = np.bincount(sorted_lengths, minlength=int(sorted_lengths[-1]) + 1)
+    counts[0] = 0
+    next_code = np.zeros_like(counts)
     code = 0
-    min_len = sorted_symbols[0][0]
-    max_len = sorted_symbols[-1][0]
-    
-    # Calculate the first code value for each length
-    for length in range(min_len, max_len + 1):
-        # next_code[L] = (next_code[L-1] + counts[L-1]) << 1
-        code = (code + counts[length - 1]) << 1
+    for length in range(1, len(counts)):
+        code = (code + int(counts[length - 1])) << 1
         next_code[length] = code
 
-    # 3. Assign codes sequentially
-    codes_map = {}
-    
-    for length, symbol in sorted_symbols:
-        current_code = next_code[length]
-        
-        codes_map[symbol] = (current_code, length)
-        
-        # Advance the starting code for this length
-        next_code[length] += 1
-        
-    return codes_map
+    # 3. Assign codes sequentially: first code of the length + rank within it
+    group_start = np.cumsum(counts) - counts
+    rank = np.arange(len(symbols)) - group_start[sorted_lengths]
+    code_arr[symbols] = next_code[sorted_lengths] + rank
+    return code_arr
+
+
+def _get_canonical_codes_map(lengths: List[int]) -> Dict[int, Tuple[int, int]]:
+    """Generates the Canonical Code map: Symbol -> (Binary Code Value, Length)."""
+    lengths_arr = np.asarray(lengths, dtype=np.int64)
+    code_arr = _get_canonical_code_values(lengths)
+
+    # Ordered by (length, symbol), as the codes were assigned
+    symbols = np.flatnonzero(lengths_arr > 0)
+    symbols = symbols[np.argsort(lengths_arr[symbols], kind="stable")]
+    return dict(zip(symbols.tolist(), zip(code_arr[symbols].tolist(), lengths_arr[symbols].tolist())))
     
-def build_canonical_huffman_codes(frequencies: Dict[int, int], max_symbols: int) -> CanonicalCodes:
+def build_canonical_huffman_codes(frequencies: Dict[int, int] | np.ndarray, max_symbols: int) -> CanonicalCodes:
     """Main function to build Canonical Huffman Codes."""
     initial_lengths = _build_initial_lengths(frequencies, max_symbols)
     final_lengths = _limit_and_canonicalize_lengths(initial_lengths, MAX_BITS)
     code_map = _get_canonical_codes_map(final_lengths)
     
-    return CanonicalCodes(code_lengths=final_lengths, code_map=code_map)
+    return CanonicalCodes(
+        code_lengths=final_lengths,
+        code_map=code_map,
+        code_arr=_get_canonical_code_values(final_lengths),
+        bitlen_arr=np.array(final_lengths, dtype=np.uint32),
+    )
 
 # ==============================================================================
 # ENCODING INFRASTRUCTURE AND PACKAGING (STEP 4 & 5)
 # ==============================================================================
 
-class BitWriter:
-    """Class for writing data at the bit level (Little-Endian Bit Ordering)."""
-    def __init__(self):
-        self.buffer = bytearray()
-        self.bit_buffer = 0  # Accumulator for current byte
-        self.bit_count = 0   # Number of bits currently in the accumulator
-
-    def write_bits(self, value: int, num_bits: int):
-        """Writes 'num_bits' from 'value' to the bitstream."""
-        for _ in range(num_bits):
-            # Extract the least significant bit (LSB) from value
-            bit = value & 1
-            
-            # Insert the bit into the current position of the bit buffer
-            self.bit_buffer |= (bit << self.bit_count)
-            self.bit_count += 1
-            
-            # Shift value for the next bit
-            value >>= 1
-            
-            # If buffer is full (8 bits), append to bytearray
-            if self.bit_count == 8:
-                self.buffer.append(self.bit_buffer)
-                self.bit_buffer = 0
-                self.bit_count = 0
-
-    def flush(self) -> bytes:
-        """Writes any remaining bits and returns the complete byte array."""
-        if self.bit_count > 0:
-            self.buffer.append(self.bit_buffer)
-        return bytes(self.buffer)
+# HuffOffsets_t: 5 x Ulong_t (tree1/tree2/tree3 offsets, LZ parameter, data offset)
+_HUFF_OFFSETS_STRUCT = struct.Struct('<LLLLL')
 
 
 def run_length_encode_lengths(lengths: List[int]) -> List[int]:
@@ -338,29 +474,33 @@ def run_length_encode_lengths(lengths: List[int]) -> List[int]:
     return lengths 
 
 
-def encode_huffman_trees(freqs: HuffmanFrequencies) -> Tuple[bytes, bytes]:
+def build_huffman_trees(freqs: HuffmanFrequencies) -> HuffmanTrees:
+    """Builds the literal, length and offset canonical codes for one block."""
+    return HuffmanTrees(
+        lit_codes=build_canonical_huffman_codes(freqs.literal_freq, max_symbols=257),
+        len_codes=build_canonical_huffman_codes(freqs.length_freq, max_symbols=LENGTH_CODE_COUNT),
+        off_codes=build_canonical_huffman_codes(freqs.offset_freq, max_symbols=30),
+    )
+
+
+def encode_huffman_trees(trees: HuffmanTrees) -> Tuple[bytes, bytes]:
     """
     Encodes the three sets of code lengths and the Code Length Code (CLC) Tree itself.
     """
     
-    # 1. Get code lengths for all three trees
-    lit_lengths = build_canonical_huffman_codes(freqs.literal_freq, 257).code_lengths
-    len_lengths = build_canonical_huffman_codes(freqs.length_freq, 29).code_lengths
-    off_lengths = build_canonical_huffman_codes(freqs.offset_freq, 30).code_lengths
-    
-    # Concatenate the lengths in the required SDAL order (assumed)
-    combined_lengths = lit_lengths + len_lengths + off_lengths
+    # 1. Concatenate the code lengths of all three trees in the required SDAL order (assumed)
+    combined_lengths = (trees.lit_codes.code_lengths
+                        + trees.len_codes.code_lengths
+                        + trees.off_codes.code_lengths)
     
     # 2. RLE-Encoding
     rle_tokens = run_length_encode_lengths(combined_lengths)
     
     # 3. Build the Code Length Code (CLC) Tree
-    clc_freq = defaultdict(int)
-    for token in rle_tokens:
-        # We only count frequencies for symbols 0-18 (the RLE alphabet)
-        if token < RLE_LITERAL_CODES:
-             clc_freq[token] += 1
-        
+    # We only count frequencies for symbols 0-18 (the RLE alphabet)
+    rle_arr = np.asarray(rle_tokens, dtype=np.int64)
+    clc_freq = np.bincount(rle_arr[rle_arr < RLE_LITERAL_CODES], minlength=RLE_LITERAL_CODES)
+
     clc_codes = build_canonical_huffman_codes(clc_freq, max_symbols=RLE_LITERAL_CODES)
     
     # 4. Serialize CLC Tree lengths and RLE tokens
@@ -374,16 +514,17 @@ def encode_huffman_trees(freqs: HuffmanFrequencies) -> Tuple[bytes, bytes]:
     return clc_data, rle_encoded_data
 
 
-def generate_szip_tree_structure(freqs: HuffmanFrequencies) -> Tuple[bytes, int]:
+def generate_szip_tree_structure(trees: HuffmanTrees) -> Tuple[bytearray, int]:
     """
     Generates the final byte block for the tree structure (HuffOffsets_t + Trees).
+    Returned as a bytearray so the caller can append the token data in place.
     """
     
-    clc_data, rle_encoded_data = encode_huffman_trees(freqs)
+    clc_data, rle_encoded_data = encode_huffman_trees(trees)
     
     # Structure: [HuffOffsets_t] [CLC_Data] [RLE_Data (Lit+Len+Off)]
     
-    HUFF_OFFSETS_T_SIZE = 5 * 4 # 20 bytes (5 Ulong_t)
+    HUFF_OFFSETS_T_SIZE = _HUFF_OFFSETS_STRUCT.size # 20 bytes (5 Ulong_t)
     
     # Calculate offsets relative to the start of HuffOffsets_t.
     # Assuming RLE-encoded lengths are stored contiguously.
@@ -391,8 +532,8 @@ def generate_szip_tree_structure(freqs: HuffmanFrequencies) -> Tuple[bytes, int]
     tree1_offset = HUFF_OFFSETS_T_SIZE # Start of the Lit lengths within RLE data
     # NOTE: The size calculation below must be based on the actual *encoded* size, 
     # not the token count. Using token count as a STUB.
-    tree2_offset = tree1_offset + len(build_canonical_huffman_codes(freqs.literal_freq, 257).code_lengths)
-    tree3_offset = tree2_offset + len(build_canonical_huffman_codes(freqs.length_freq, 29).code_lengths)
+    tree2_offset = tree1_offset + len(trees.lit_codes.code_lengths)
+    tree3_offset = tree2_offset + len(trees.len_codes.code_lengths)
     
     # Offset to compressed data: Header + CLC data + RLE data
     data_offset = HUFF_OFFSETS_T_SIZE + len(clc_data) + len(rle_encoded_data)
@@ -400,15 +541,17 @@ def generate_szip_tree_structure(freqs: HuffmanFrequencies) -> Tuple[bytes, int]
     # HuffOffsets_t: Ulong_t treeOff1, Ulong_t treeOff2, Ulong_t treeOff3, Ulong_t parameter, Ulong_t dataOff
     lz_parameter = LZ77Constants.WINDOW_SIZE 
     
-    # Use little-endian '<' packing
-    header_bytes = struct.pack('<LLLLL', 
+    # Use little-endian '<' packing, straight into the block buffer
+    final_tree_block = bytearray(data_offset)
+    _HUFF_OFFSETS_STRUCT.pack_into(final_tree_block, 0,
                                tree1_offset, 
                                tree2_offset, 
                                tree3_offset, 
                                lz_parameter, 
                                data_offset)
-                               
-    final_tree_block = header_bytes + clc_data + rle_encoded_data
+    clc_end = HUFF_OFFSETS_T_SIZE + len(clc_data)
+    final_tree_block[HUFF_OFFSETS_T_SIZE:clc_end] = clc_data
+    final_tree_block[clc_end:data_offset] = rle_encoded_data
     
     return final_tree_block, data_offset
 
@@ -416,56 +559,88 @@ def generate_szip_tree_structure(freqs: HuffmanFrequencies) -> Tuple[bytes, int]
 # LZ77 TOKEN ENCODING (STEP 6)
 # ==============================================================================
 
-def encode_tokens(tokens: List[LZ77Token], 
+def _lookup_codes(codes: CanonicalCodes, symbols: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+    """(code value, bit length) per symbol; symbols outside the table get length 0."""
+    in_range = symbols < len(codes.bitlen_arr)
+    safe = np.where(in_range, symbols, 0)
+    values = np.where(in_range, codes.code_arr[safe], 0).astype(np.int64)
+    bits = np.where(in_range, codes.bitlen_arr[safe], 0).astype(np.int64)
+    return values, bits
+
+
+def encode_tokens(tokens: LZ77Tokens, 
                   lit_codes: CanonicalCodes, 
                   len_codes: CanonicalCodes, 
                   off_codes: CanonicalCodes) -> bytes:
     """
     Encodes LZ77 tokens into a bitstream using the generated Huffman codes.
+
+    Built with numpy from the flat code tables: each token is a row of five
+    (value, bit count) fields -
+      LITERAL: flag bit 1, Huffman code of the byte
+      MATCH:   flag bit 0, length code, length extra bits, offset code,
+               offset extra bits
+    - unused fields have 0 bits; the rows, then EOD (flagged as a literal),
+    are expanded to single bits and packed in one call. The flag tells the
+    decoder which tree the next code comes from, as in PKZIP Implode.
+    As in Deflate, bytes are filled LSB first,
+    Huffman codes are written starting with their most significant bit and
+    extra bits starting with their least significant bit.
     """
-    writer = BitWriter()
-    
-    for token in tokens:
-        if token.type == "LITERAL":
-            # 1. Encode Literal
-            symbol = token.value
-            code, length = lit_codes.code_map[symbol]
-            writer.write_bits(code, length)
-            
-        elif token.type == "MATCH":
-            
-            # 2. Encode Length
-            length_code, extra_len_bits = get_length_code(token.length)
-            
-            # 2a. Write Huffman Code for the Base Length
-            code, length = len_codes.code_map[length_code]
-            writer.write_bits(code, length)
-            
-            # 2b. Write Extra Bits for the precise length
-            if extra_len_bits > 0:
-                # ⚠️ STUB: Extra value calculation logic depends on the L/D map tables
-                extra_value = 0 
-                writer.write_bits(extra_value, extra_len_bits)
-                
-            # 3. Encode Offset
-            offset_code, extra_off_bits = get_offset_code(token.offset)
-            
-            # 3a. Write Huffman Code for the Base Offset
-            code, length = off_codes.code_map[offset_code]
-            writer.write_bits(code, length)
-            
-            # 3b. Write Extra Bits for the precise offset
-            if extra_off_bits > 0:
-                # ⚠️ STUB: Extra value calculation logic depends on the L/D map tables
-                extra_value = 0 
-                writer.write_bits(extra_value, extra_off_bits)
-
-    # 4. Encode End-of-Data (EOD) Symbol
-    eod_symbol = EOD_CODE 
-    code, length = lit_codes.code_map[eod_symbol]
-    writer.write_bits(code, length)
-
-    return writer.flush()
+    n = len(tokens)
+    is_match = tokens.kinds == TOKEN_MATCH
+
+    # Symbols looked up in each Huffman table (0 where the field is unused)
+    symbols = np.zeros((n, 4), dtype=np.int64)
+    extra = np.zeros((n, 4), dtype=np.int64)
+    symbols[~is_match, 0] = tokens.a[~is_match]
+    symbols[is_match, 0], extra[is_match, 1] = get_length_codes(tokens.a[is_match])
+    symbols[is_match, 2], extra[is_match, 3] = get_offset_codes(tokens.b[is_match])
+
+    values = np.zeros((n, 4), dtype=np.int64)
+    nbits = np.zeros((n, 4), dtype=np.int64)
+    # 1. Literals
+    values[~is_match, 0], nbits[~is_match, 0] = _lookup_codes(lit_codes, symbols[~is_match, 0])
+    # 2a/3a. Huffman codes for the base length / offset
+    values[is_match, 0], nbits[is_match, 0] = _lookup_codes(
+        len_codes, symbols[is_match, 0] - FIRST_LENGTH_CODE)
+    values[is_match, 2], nbits[is_match, 2] = _lookup_codes(off_codes, symbols[is_match, 2])
+    # 2b/3b. Extra bits: distance above the code's base value (table lookup + one subtract).
+    # Length 258 (MAX_LENGTH_CODE) has no extra bits, its base index is only clamped.
+    len_idx = np.minimum(symbols[is_match, 0] - FIRST_LENGTH_CODE, len(LENGTH_BASES) - 1)
+    values[is_match, 1] = tokens.a[is_match] - LENGTH_BASES[len_idx]
+    values[is_match, 3] = tokens.b[is_match] - DIST_BASES[symbols[is_match, 2]]
+    nbits[:, 1] = extra[:, 1]
+    nbits[:, 3] = extra[:, 3]
+
+    # A symbol without a code is an error, reported for the first one in stream order
+    huffman = np.zeros((n, 4), dtype=bool)
+    huffman[:, 0] = True
+    huffman[:, 2] = is_match
+    missing = np.flatnonzero((huffman & (nbits == 0)).ravel())
+    if len(missing):
+        raise KeyError(int(symbols.ravel()[missing[0]]))
+    eod_value, eod_bits = _lookup_codes(lit_codes, np.array([EOD_CODE]))
+    if eod_bits[0] == 0:
+        raise KeyError(EOD_CODE)
+
+    # Literal/match flag in front of every token
+    values = np.column_stack(((~is_match).astype(np.int64), values))
+    nbits = np.column_stack((np.ones(n, dtype=np.int64), nbits))
+    huffman = np.column_stack((np.zeros(n, dtype=bool), huffman))
+
+    # 4. End-of-Data (EOD) Symbol closes the stream
+    values = np.append(values.ravel(), [1, eod_value[0]])
+    nbits = np.append(nbits.ravel(), [1, eod_bits[0]])
+    huffman = np.append(huffman.ravel(), [False, True])
+
+    # Expand every field into its bits (Huffman codes MSB first) and pack little-endian
+    starts = np.cumsum(nbits) - nbits
+    field_of_bit = np.repeat(np.arange(len(nbits)), nbits)
+    bit_index = np.arange(len(field_of_bit)) - starts[field_of_bit]
+    shift = np.where(huffman[field_of_bit], nbits[field_of_bit] - 1 - bit_index, bit_index)
+    bits = ((values[field_of_bit] >> shift) & 1).astype(np.uint8)
+    return np.packbits(bits, bitorder="little").tobytes()
 
 # ==============================================================================
 # MAIN COMPRESSION PIPELINE
@@ -482,23 +657,21 @@ def compress_szip(data: bytes) -> bytes:
     # 2. Frequency Gathering
     freqs = calculate_huffman_frequencies(tokens)
     
-    # 3. Canonical Huffman Code Construction
-    lit_codes = build_canonical_huffman_codes(freqs.literal_freq, max_symbols=257) 
-    len_codes = build_canonical_huffman_codes(freqs.length_freq, max_symbols=29) 
-    off_codes = build_canonical_huffman_codes(freqs.offset_freq, max_symbols=30)
+    # 3. Canonical Huffman Code Construction (once; reused by steps 4 and 5)
+    trees = build_huffman_trees(freqs)
     
     # 4. Tree Structure Encoding (Header + Code Lengths)
-    tree_block, data_offset = generate_szip_tree_structure(freqs)
+    tree_block, data_offset = generate_szip_tree_structure(trees)
     
     # 5. Encode LZ77 Tokens into Bitstream
     compressed_data_bytes = encode_tokens(
-        tokens, lit_codes, len_codes, off_codes
+        tokens, trees.lit_codes, trees.len_codes, trees.off_codes
     )
     
     # 6. Final Parcel Assembly: [Tree Block] [Compressed Token Data]
-    final_compressed_parcel = tree_block + compressed_data_bytes
+    tree_block += compressed_data_bytes
     
-    return final_compressed_parcel
+    return bytes(tree_block)
 
 if __name__ == '__main__':
     # Example usage for self-testing
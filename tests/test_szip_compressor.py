@@ -0,0 +1,106 @@
+import random
+import struct
+import unittest
+
+from sdal_builder.szip_compressor import (
+    DIST_BASES,
+    DISTANCE_MAP,
+    EOD_CODE,
+    FIRST_LENGTH_CODE,
+    LENGTH_BASES,
+    LENGTH_CODE_COUNT,
+    LENGTH_EXTRA_BITS,
+    DIST_EXTRA_BITS,
+    MAX_LENGTH_CODE,
+    LZ77Constants,
+    _get_canonical_codes_map,
+    compress_szip,
+)
+
+
+def decompress_szip(block: bytes) -> bytes:
+    """Reference decoder for compress_szip() output."""
+    data_offset = struct.unpack_from("<LLLLL", block, 0)[4]
+
+    # The three trees' code lengths are stored raw right before the token data
+    sizes = (EOD_CODE + 1, LENGTH_CODE_COUNT, len(DISTANCE_MAP) + 1)
+    lengths = list(block[data_offset - sum(sizes):data_offset])
+    tables = []
+    for size in sizes:
+        code_map = _get_canonical_codes_map(lengths[:size])
+        tables.append({code: symbol for symbol, code in code_map.items()})
+        lengths = lengths[size:]
+    lit_table, len_table, off_table = tables
+
+    stream = block[data_offset:]
+    pos = 0
+
+    def read_bit() -> int:
+        nonlocal pos
+        bit = (stream[pos >> 3] >> (pos & 7)) & 1
+        pos += 1
+        return bit
+
+    def read_extra(num_bits: int) -> int:
+        return sum(read_bit() << i for i in range(num_bits))
+
+    def read_symbol(table) -> int:
+        code = 0
+        for bits in range(1, 16):
+            code = (code << 1) | read_bit()
+            if (code, bits) in table:
+                return table[(code, bits)]
+        raise ValueError("invalid Huffman code")
+
+    out = bytearray()
+    while True:
+        if read_bit():
+            symbol = read_symbol(lit_table)
+            if symbol == EOD_CODE:
+                return bytes(out)
+            out.append(symbol)
+            continue
+
+        length_code = read_symbol(len_table) + FIRST_LENGTH_CODE
+        if length_code == MAX_LENGTH_CODE:
+            length = LZ77Constants.MAX_MATCH_LENGTH
+        else:
+            idx = length_code - FIRST_LENGTH_CODE
+            length = int(LENGTH_BASES[idx]) + read_extra(int(LENGTH_EXTRA_BITS[idx]))
+        offset_code = read_symbol(off_table)
+        offset = int(DIST_BASES[offset_code]) + read_extra(int(DIST_EXTRA_BITS[offset_code]))
+
+        for _ in range(length):
+            out.append(out[-offset])
+
+
+class CompressSzipRoundTripTest(unittest.TestCase):
+    def assertRoundTrip(self, data: bytes) -> None:
+        self.assertEqual(decompress_szip(compress_szip(data)), data)
+
+    def test_repeated_pattern(self):
+        self.assertRoundTrip(b"WEE_WEE_WEE_WEE_IS_A_PATTERN_PATTERN" * 2)
+
+    def test_long_runs(self):
+        # Runs of MAX_MATCH_LENGTH (258) matches; a lone length code still gets a code
+        self.assertRoundTrip(b"a" * 1000)
+        self.assertRoundTrip(b"ab" * 700 + b"xyz" * 5)
+
+    def test_far_offsets(self):
+        rng = random.Random(0)
+        chunk = bytes(rng.randrange(256) for _ in range(5000))
+        self.assertRoundTrip(chunk + bytes(rng.randrange(4) for _ in range(3000)) + chunk)
+
+    def test_mixed_text(self):
+        rng = random.Random(1)
+        words = [b"road", b"parcel", b"node", b"segment", b"SDAL", b" ", b"\x00\x01"]
+        self.assertRoundTrip(b"".join(rng.choice(words) for _ in range(2000)))
+
+    def test_literals_only(self):
+        self.assertRoundTrip(b"")
+        self.assertRoundTrip(b"x")
+        self.assertRoundTrip(bytes(range(256)))
+
+
+if __name__ == "__main__":
+    unittest.main()
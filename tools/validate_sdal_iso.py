@@ -1,10 +1,11 @@
 import sys
 import struct
-import io
 import logging
+import mmap
 import os
 import re
-from typing import Tuple, Set, Optional
+from concurrent.futures import ProcessPoolExecutor
+from typing import Dict, List, Tuple, Set, Optional
 
 try:
     from pycdlib import PyCdlib
@@ -43,6 +44,15 @@ def info(msg): log.info(f"{Color.BLUE}[INFO] {msg}{Color.RESET}")
 # --- Constants ---
 BLOCK_SIZE = 4096
 PCL_HEADER_LEN = 20 # Length of the Parcel Header
+_NONZERO_BYTE = re.compile(rb"[^\x00]")
+_SDL_FILENAME_RE = re.compile(r'([A-Z0-9]{1,15}\.SDL)', re.IGNORECASE)  # INIT.SDL file list
+
+# Precompiled layouts (format strings parsed once)
+# PclHdr_t is >I H B B B B H H H H H; only ulParcelId and the size words are read
+_PARCEL_ID_SIZE_STRUCT = struct.Struct(">I6xHH")
+_UINT32_STRUCT = struct.Struct(">I")
+_CARTOTOP_STRUCT = struct.Struct(">iiiiH")           # DBRect_t + region count
+_IDXPCL_STRUCT = struct.Struct(">HHIIiiHHHH")        # IDxPclHdr_t
 
 # PIDs
 GLB_MEDIA_HEADER_PID = 0x13
@@ -50,6 +60,9 @@ NAV_PARCEL_ID        = 0x0001
 
 # --- Global State for Validation Mode ---
 VALIDATION_MODE = 'OEM' 
+_SHOW_PROGRESS = True  # per-file tqdm bars (off in worker processes)
+_PBAR_PARCELS = 256
+_PBAR_BYTES = 1 << 20
 
 # --- Constants for INIT.SDL Header checks ---
 OEM_INIT_HEADER_ID = 0x0002A000  # Typical OEM ID (e.g., Saab)
@@ -60,17 +73,51 @@ SDAL_STRICT_ASCII_START = b' ' # Strict SDAL 1.7 standard start byte
 # ISO HELPER
 # -----------------------------------------------------------------------------
 
-def get_file_content(iso, filename) -> bytes:
-    """Retrieves file content from ISO image."""
-    candidates = [f"/{filename}", f"/{filename};1"]
-    for path in candidates:
-        try:
-            with io.BytesIO() as f:
-                iso.get_file_from_iso_fp(f, iso_path=path)
-                return f.getvalue()
-        except Exception:
+# Index/meta files: read for the global validators, no parcel-chain check
+_META_FILES = (
+    "MTOC.SDL", "REGION.SDL", "REGIONS.SDL", "INIT.SDL",
+    "CARTOTOP.SDL", "KDTREE.SDL",
+)
+_GLOBAL_FILES = ("INIT.SDL", "MTOC.SDL", "CARTOTOP.SDL", "KDTREE.SDL")
+
+def is_media_file(name_upper: str) -> bool:
+    """Density (DENS*), Font (*F.SDL), Media (*M.SDL) and Data (*D.SDL) files."""
+    return name_upper.startswith("DENS") or name_upper.endswith(("F.SDL", "M.SDL", "D.SDL"))
+
+def map_iso(iso_path: str) -> mmap.mmap:
+    """Read-only mapping of the whole ISO image (file contents are sliced from it, not copied)."""
+    with open(iso_path, "rb") as fh:
+        return mmap.mmap(fh.fileno(), 0, access=mmap.ACCESS_READ)
+
+def locate_root_files(iso, entries, iso_size: int) -> Tuple[Dict[str, Tuple[int, int]], Dict[str, Exception]]:
+    """
+    Resolves the root files needed for validation in a single pass over the
+    directory listing: {NAME.SDL: (byte offset, length) in the image} and
+    {NAME.SDL: error}. Media/density files are skipped.
+    """
+    extents: Dict[str, Tuple[int, int]] = {}
+    errors: Dict[str, Exception] = {}
+    for child in entries:
+        name_raw = child.file_identifier().decode("ascii", errors="ignore")
+        name_upper = name_raw.split(";")[0].upper()
+        if name_upper not in _GLOBAL_FILES and (name_upper in _META_FILES or is_media_file(name_upper)):
             continue
-    raise FileNotFoundError(f"File {filename} not found in ISO root.")
+        try:
+            start = child.extent_location() * iso.logical_block_size
+            length = child.get_data_length()
+            if start + length > iso_size:
+                raise ValueError(f"extent 0x{start:X}+{length} runs past the end of the image")
+            extents[name_upper] = (start, length)
+        except Exception as e:
+            errors[name_upper] = e
+    return extents, errors
+
+def get_file_content(files: Dict[str, memoryview], filename) -> memoryview:
+    """Retrieves a file located by locate_root_files() (zero-copy view into the ISO)."""
+    try:
+        return files[filename.upper()]
+    except KeyError:
+        raise FileNotFoundError(f"File {filename} not found in ISO root.") from None
 
 # -----------------------------------------------------------------------------
 # STRUCTURAL HELPERS
@@ -84,9 +131,8 @@ def read_parcel_header_fast(view: memoryview, offset: int) -> Optional[Tuple[int
     if offset + PCL_HEADER_LEN > len(view):
         return None
     
-    # >I H B B B B H H H H H
-    ul_parcel_id, _, _, _, _, _, size_hi, size_lo, _, _, _ = \
-        struct.unpack_from(">IHBBBBHHHHH", view, offset)
+    # >I [H B B B B] H H (remaining H H H unused)
+    ul_parcel_id, size_hi, size_lo = _PARCEL_ID_SIZE_STRUCT.unpack_from(view, offset)
 
     # 1. Decode Parcel ID (8 bits)
     pid = ul_parcel_id & 0xFF
@@ -111,8 +157,8 @@ def _check_padding(filename: str, view: memoryview, start_offset: int, end_offse
 
     padding_to_check = view[start_offset:end_offset]
     
-    # Check if any byte is non-zero
-    if any(b != 0 for b in padding_to_check):
+    # Check if any byte is non-zero (C-level scan, no per-byte Python loop)
+    if _NONZERO_BYTE.search(view, start_offset, end_offset) is not None:
         if VALIDATION_MODE == 'SDAL17':
             # Strict mode: FAIL on non-zero padding
             fail(f"{filename}: Non-zero padding/junk found from 0x{start_offset:X} to 0x{end_offset:X}. (SDAL 1.7 requires zero padding)")
@@ -136,27 +182,42 @@ def validate_parcel_chain(filename: str, data: bytes) -> Tuple[bool, Set[int]]:
     is_valid = True
     
     desc = f"⛓️  Checking {filename} ({VALIDATION_MODE})"
-    with tqdm(total=file_size, unit='B', unit_scale=True, desc=desc, leave=True, mininterval=0.1) as pbar:
+    # Progress is reported in coarse steps (every _PBAR_PARCELS parcels or _PBAR_BYTES)
+    pending_bytes = 0
+    pending_parcels = 0
+    with tqdm(total=file_size, unit='B', unit_scale=True, desc=desc, leave=True, mininterval=0.5,
+              disable=not _SHOW_PROGRESS) as pbar:
         
         while offset < file_size:
             parcel_start = -1
             
             # 1. Search for the next valid parcel header within the current block
             search_limit = min(file_size, offset + BLOCK_SIZE) 
-            
-            for i in range(offset, search_limit):
-                if i + PCL_HEADER_LEN > file_size:
-                    break
-                    
-                temp_res = read_parcel_header_fast(view, i)
-                
-                if temp_res:
-                    pid, ul_parcel_id, total_len = temp_res
-                    
-                    # Check for valid PID and boundary check
-                    if pid != 0 and (i + total_len <= file_size):
+
+            # Fast path: in a well-formed file the previous parcel + pad ends
+            # exactly where the next header starts
+            res = read_parcel_header_fast(view, offset)
+            if res is not None and res[0] != 0 and offset + res[2] <= file_size:
+                parcel_start = offset
+            else:
+                # Only offsets whose PID byte (low byte of the BE ulParcelId, i + 3)
+                # is non-zero can start a parcel: jump between them with a C-level
+                # regex search instead of unpacking a header at every byte.
+                pos = offset + 3
+                end = min(search_limit, file_size - PCL_HEADER_LEN + 1) + 3
+                while pos < end:
+                    m = _NONZERO_BYTE.search(data, pos, end)
+                    if m is None:
+                        break
+                    i = m.start() - 3
+
+                    pid, ul_parcel_id, total_len = read_parcel_header_fast(view, i)
+
+                    # Boundary check (PID is non-zero by construction)
+                    if i + total_len <= file_size:
                         parcel_start = i
                         break
+                    pos = m.start() + 1
             
             # 2. Process found or missing parcel
             if parcel_start != -1:
@@ -185,7 +246,11 @@ def validate_parcel_chain(filename: str, data: bytes) -> Tuple[bool, Set[int]]:
                         break # Critical failure in SDAL17 mode
 
                 step = total_len + pad
-                pbar.update(step)
+                pending_bytes += step
+                pending_parcels += 1
+                if pending_parcels >= _PBAR_PARCELS or pending_bytes >= _PBAR_BYTES:
+                    pbar.update(pending_bytes)
+                    pending_bytes = pending_parcels = 0
                 offset += step
                 pids_found.add(pid)
                 parcel_count += 1
@@ -199,9 +264,11 @@ def validate_parcel_chain(filename: str, data: bytes) -> Tuple[bool, Set[int]]:
                     if not _check_padding(filename, view, offset, file_size, is_final_junk=True):
                         is_valid = False
                     
-                    pbar.update(remaining)
+                    pending_bytes += remaining
                 
                 break # Exit the loop
+
+        pbar.update(pending_bytes)
             
     # Final check reporting
     if is_valid:
@@ -220,12 +287,12 @@ def validate_parcel_chain(filename: str, data: bytes) -> Tuple[bool, Set[int]]:
 # FILE SPECIFIC VALIDATORS (Mode-aware INIT.SDL)
 # -----------------------------------------------------------------------------
 
-def validate_init_sdl(iso) -> bool:
+def validate_init_sdl(files: Dict[str, memoryview]) -> bool:
     """Checks the INIT.SDL header and attempts to parse the file list."""
     global VALIDATION_MODE
     info("📄 Checking INIT.SDL...")
     try:
-        content = get_file_content(iso, "INIT.SDL")
+        content = bytes(get_file_content(files, "INIT.SDL"))  # small; text ops below need bytes
     except Exception:
         fail("INIT.SDL missing!")
         return False
@@ -235,7 +302,7 @@ def validate_init_sdl(iso) -> bool:
         fail("INIT.SDL is too short for any header.")
         return False
         
-    ul_parcel_id = struct.unpack_from(">I", content, 0)[0]
+    ul_parcel_id = _UINT32_STRUCT.unpack_from(content, 0)[0]
 
     # --- 1. Header Check ---
     if VALIDATION_MODE == 'OEM':
@@ -257,13 +324,10 @@ def validate_init_sdl(iso) -> bool:
         # Decode the whole content, ignoring non-ASCII characters, which is common in OEM files.
         text_full = content.decode('ascii', 'ignore')
         
-        # Regex to find file names (1-15 chars followed by .SDL)
-        file_name_pattern = re.compile(r'([A-Z0-9]{1,15}\.SDL)', re.IGNORECASE)
-        
         found_files = set()
         
-        # Search for all matches in the text content
-        for match in file_name_pattern.finditer(text_full):
+        # Search for all file names (1-15 chars followed by .SDL) in the text content
+        for match in _SDL_FILENAME_RE.finditer(text_full):
             found_files.add(match.group(1).upper().split(';')[0])
         
         # Remove known non-file list entries that might get picked up (like CARTOTOP, KDTREE, etc.)
@@ -283,11 +347,11 @@ def validate_init_sdl(iso) -> bool:
         
     return is_ok
 
-def validate_cartotop(iso):
+def validate_cartotop(files: Dict[str, memoryview]):
     """Checks existence and simple bounds structure of CARTOTOP.SDL."""
     info("🌍 Checking CARTOTOP.SDL...")
     try:
-        data = get_file_content(iso, "CARTOTOP.SDL")
+        data = get_file_content(files, "CARTOTOP.SDL")
     except:
         fail("CARTOTOP.SDL missing!")
         return
@@ -299,16 +363,16 @@ def validate_cartotop(iso):
     try:
         # PclHdr_t (20 bytes) + DBRect_t (16 bytes) + H (2 bytes count) = 38 bytes
         chunk = data[20:38]
-        min_lon, min_lat, max_lon, max_lat, count = struct.unpack(">iiiiH", chunk)
+        min_lon, min_lat, max_lon, max_lat, count = _CARTOTOP_STRUCT.unpack(chunk)
         pass_check(f"CARTOTOP Bounds: ({min_lat},{min_lon}) to ({max_lat},{max_lon}). Regions: {count}")
     except Exception as e:
         fail(f"CARTOTOP parse error: {e}")
 
-def validate_kdtree(iso):
+def validate_kdtree(files: Dict[str, memoryview]):
     """Checks existence and simple bounds structure of KDTREE.SDL."""
     info("🌳 Checking KDTREE.SDL...")
     try:
-        data = get_file_content(iso, "KDTREE.SDL")
+        data = get_file_content(files, "KDTREE.SDL")
     except:
         fail("KDTREE.SDL missing.")
         return
@@ -324,16 +388,16 @@ def validate_kdtree(iso):
         # IDxPclHdr_t starts after PclHdr_t (20 bytes)
         idx_data = data[PCL_HEADER_LEN:PCL_HEADER_LEN + IDXPCL_HEADER_LEN]
         # Format: H H I I i i H H H H (28 bytes)
-        _, _, _, _, min_lat, min_lon, _, _, _, _ = struct.unpack(">HHIIiiHHHH", idx_data)
+        _, _, _, _, min_lat, min_lon, _, _, _, _ = _IDXPCL_STRUCT.unpack(idx_data)
         pass_check(f"KDTREE Valid Bounds: {min_lat}, {min_lon}")
     except Exception as e:
         warn(f"KDTREE bounds check failed: {e}")
 
-def validate_mtoc(iso):
+def validate_mtoc(files: Dict[str, memoryview]):
     """Checks existence and reports entry count for MTOC.SDL."""
     info("📋 Checking MTOC.SDL...")
     try:
-        data = get_file_content(iso, "MTOC.SDL")
+        data = get_file_content(files, "MTOC.SDL")
     except:
         fail("MTOC.SDL missing.")
         return
@@ -346,6 +410,39 @@ def validate_mtoc(iso):
     pass_check(f"MTOC has {count} entries.")
 
 
+# -----------------------------------------------------------------------------
+# PARALLEL CHAIN VALIDATION
+# -----------------------------------------------------------------------------
+
+class _RecordBuffer(logging.Handler):
+    """Keeps a worker's log records so the parent can replay them in file order."""
+    def __init__(self):
+        super().__init__()
+        self.records: List[logging.LogRecord] = []
+
+    def emit(self, record):
+        self.records.append(record)
+
+_worker_log: Optional[_RecordBuffer] = None
+_worker_iso: Optional[mmap.mmap] = None
+
+def _init_worker(mode: str, iso_path: str):
+    """ProcessPoolExecutor initializer: same mode and ISO mapping as the parent, no bars, buffered log."""
+    global VALIDATION_MODE, _SHOW_PROGRESS, _worker_log, _worker_iso
+    VALIDATION_MODE = mode
+    _worker_iso = map_iso(iso_path)
+    _SHOW_PROGRESS = False
+    _worker_log = _RecordBuffer()
+    log.handlers = [_worker_log]
+    log.propagate = False
+
+def _validate_worker(filename: str, start: int, length: int) -> Tuple[bool, List[logging.LogRecord]]:
+    """validate_parcel_chain() on an ISO extent in a worker process; returns (is_valid, log records)."""
+    _worker_log.records = []
+    is_valid, _ = validate_parcel_chain(filename, memoryview(_worker_iso)[start:start + length])
+    return is_valid, _worker_log.records
+
+
 # -----------------------------------------------------------------------------
 # MAIN
 # -----------------------------------------------------------------------------
@@ -397,49 +494,61 @@ def main():
         iso.close()
         sys.exit(1)
 
-    # 3. Global Validators
-    all_files_ok = validate_init_sdl(iso) 
-    validate_mtoc(iso)
-    validate_cartotop(iso)
-    validate_kdtree(iso)
-
-    # 4. Check Map Files
-    for child in sdl_entries:
-        name_raw = child.file_identifier().decode("ascii", errors="ignore")
-        name = name_raw.split(";")[0]
-        
+    # 3. Locate everything needed in one pass, then run the Global Validators
+    #    on views into a single read-only mapping of the image
+    try:
+        iso_map = map_iso(iso_path)
+    except (OSError, ValueError) as e:
+        fail(f"Cannot map ISO: {e}")
+        iso.close()
+        sys.exit(1)
+    extents, read_errors = locate_root_files(iso, sdl_entries, len(iso_map))
+    iso.close()
+    iso_view = memoryview(iso_map)
+    files = {name: iso_view[start:start + length] for name, (start, length) in extents.items()}
+
+    all_files_ok = validate_init_sdl(files) 
+    validate_mtoc(files)
+    validate_cartotop(files)
+    validate_kdtree(files)
+
+    # 4. Check Map Files: chains are validated in parallel worker processes,
+    #    their reports are replayed below in directory order.
+    names = [child.file_identifier().decode("ascii", errors="ignore").split(";")[0]
+             for child in sdl_entries]
+    jobs = [name for name in names if name.upper() in files and name.upper() not in _META_FILES]
+    results = {}
+    if jobs:
+        with ProcessPoolExecutor(max_workers=min(len(jobs), os.cpu_count() or 1),
+                                 initializer=_init_worker, initargs=(VALIDATION_MODE, iso_path)) as ex:
+            futures = [ex.submit(_validate_worker, name, *extents[name.upper()]) for name in jobs]
+            results = {name: fut.result() for name, fut in zip(jobs, futures)}
+
+    for name in names:
         name_upper = name.upper()
 
         # Filter 1: Skip critical index/meta files
-        if name_upper in (
-            "MTOC.SDL", "REGION.SDL", "REGIONS.SDL", "INIT.SDL", 
-            "CARTOTOP.SDL", "KDTREE.SDL",
-        ):
+        if name_upper in _META_FILES:
             info(f"* {name}: (Structural validation skipped. Index/Meta file.)")
             continue
             
         # Filter 2: Skip Density (DENS), Font (*F.SDL), Media (*M.SDL), Data (*D.SDL) files
-        if name_upper.startswith("DENS") or name_upper.endswith(("F.SDL", "M.SDL", "D.SDL")):
+        if is_media_file(name_upper):
              info(f"* {name}: (Structural validation skipped. Media/Density file.)")
              continue
         
-        # Read file contents.
-        buf = io.BytesIO()
-        try:
-            iso.get_file_from_iso_fp(buf, iso_path=f"/{name_raw}")
-        except Exception as e:
-            fail(f"Could not read {name}: {e}")
+        # File contents (preloaded).
+        if name_upper in read_errors:
+            fail(f"Could not read {name}: {read_errors[name_upper]}")
             all_files_ok = False
             continue
-            
-        data = buf.getvalue()
 
         # Check map structure
-        is_valid, _ = validate_parcel_chain(name, data)
+        is_valid, records = results[name]
+        for record in records:
+            log.handle(record)
         if not is_valid:
             all_files_ok = False
-
-    iso.close()
     
     final_status = "PASSED" if all_files_ok else "FAILED"
     info(f"*** ISO VALIDATION COMPLETE: {final_status} in {VALIDATION_MODE} mode. ***")
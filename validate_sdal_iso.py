@@ -8,9 +8,12 @@ Light‑weight structural validator for SDAL / PSF style ISO images.
 It uses the canonical SDAL 1.7 PclHdr_t C-structure.
 """
 
+import argparse
+import mmap
+import os
 import sys
-import io
-from typing import Tuple, Dict, Any
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import Tuple, Dict, Any, List, Optional
 
 try:
     from pycdlib import PyCdlib
@@ -20,12 +23,39 @@ except ImportError:  # pragma: no cover - runtime dependency
 
 import struct
 
+import numpy as np
+
 # Canonical PclHdr_t C-structure (20 bytes, Big-Endian)
 # I H B B B B H H H H H
-# ulParcelId (I), usPayloadSize (H), ucRegion (B), ucParcelType (B), ucParcelDesc (B), ucCompressType (B), usCmpDataSizeHi (H), usCmpDataSizeLo (H), usCmpDataUncompSize (H), usExtensionOffset (H)
+# ulParcelId (I), usPayloadSize (H), ucRegion (B), ucParcelType (B), ucParcelDesc (B), ucCompressType (B), usCmpDataSizeHi (H), usCmpDataSizeLo (H), usCmpDataUncompSize (H), usExtensionOffset (H), usReserved (H)
 _PCL_STRUCT = struct.Struct(">I H B B B B H H H H H")
 _PCL_HEADER_LEN = 20
 
+# ISO 9660 name suffix of the SDL files in the root directory (version ";1")
+_SDL_SUFFIX = b".SDL;1"
+
+# Same layout as a NumPy record, for decoding all headers of a file at once
+_PCL_DTYPE = np.dtype([
+    ("ulParcelId", ">u4"),
+    ("usPayloadSize", ">u2"),
+    ("ucRegion", "u1"),
+    ("ucParcelType", "u1"),
+    ("ucParcelDesc", "u1"),
+    ("ucCompressType", "u1"),
+    ("usCmpDataSizeHi", ">u2"),
+    ("usCmpDataSizeLo", ">u2"),
+    ("usCmpDataUncompSize", ">u2"),
+    ("usExtensionOffset", ">u2"),
+    ("usReserved", ">u2"),
+])
+assert _PCL_DTYPE.itemsize == _PCL_STRUCT.size == _PCL_HEADER_LEN
+
+# Only the size words are needed to step from one header to the next.
+# All binary reads go through module-level Struct objects: a compiled
+# Struct.unpack_from beats both struct.unpack(fmt, ...) (format re-parsed per
+# call) and int.from_bytes on slices, so don't add ad-hoc format strings.
+_PCL_SIZE_STRUCT = struct.Struct(">10xHH")
+
 # Compression codes (для отчета)
 COMPRESSION_CODES = {
     0x01: "NO_COMPRESSION",
@@ -43,75 +73,149 @@ def decode_parcelid(pid: int) -> Dict[str, Any]:
     }
 
 
-def validate_sdl_struct(filename: str, data: bytes, block_size: int = 2048) -> bool:
+def parcel_offset_units(pids: np.ndarray) -> np.ndarray:
+    """Offset units (low 24 bits) of an array of ParcelID_t values."""
+    return pids.astype(np.uint32) & 0x00FFFFFF
+
+
+def _parcel_offsets(data, block_size: int) -> Tuple[np.ndarray, int]:
     """
-    Validates the structure of a single SDL file (which contains one or more parcels).
+    First pass: walks the header chain (each step depends on the previous
+    header's size) and returns (header offsets, offset where the walk stopped).
     """
+    n = len(data)
+    offsets = []
     offset = 0
-    file_ok = True
-
-    while offset < len(data):
-        if len(data) - offset < _PCL_HEADER_LEN:
-            print(f"  [ERROR] File end reached unexpectedly at offset {offset}. Remaining bytes: {len(data) - offset}")
-            file_ok = False
-            break
-
-        header_bytes = data[offset : offset + _PCL_HEADER_LEN]
-        
-        try:
-            (
-                ulParcelId, usPayloadSize, ucRegion, ucParcelType, ucParcelDesc, ucCompressType, 
-                usCmpDataSizeHi, usCmpDataSizeLo, usCmpDataUncompSize, usExtensionOffset
-            ) = _PCL_STRUCT.unpack(header_bytes)
-        except struct.error as e:
-            print(f"  [ERROR] Cannot unpack PclHdr_t at offset {offset}: {e}")
-            file_ok = False
-            break
-
-        pid_info = decode_parcelid(ulParcelId)
-        
-        # Combined compressed data size (ulCmpDataSize)
-        ulCmpDataSize = (usCmpDataSizeHi << 16) | usCmpDataSizeLo
-        
-        # Report
-        print(f"* {filename} @ {offset}: PID={ulParcelId} (OffsetUnits={pid_info['offset_units']})")
-        print(f"  Region={ucRegion}, Type={ucParcelType}, Desc={ucParcelDesc}, Compress={COMPRESSION_CODES.get(ucCompressType, f'0x{ucCompressType:02x}')}")
-        print(f"  CompSize={ulCmpDataSize}, UncompSize={usCmpDataUncompSize}, PayloadSizeH={usPayloadSize}")
-
-        # Validation Logic
-        parcel_ok = True
-        
-        # 1. Check if compressed payload fits in file
-        expected_total_size = _PCL_HEADER_LEN + ulCmpDataSize
-        if offset + expected_total_size > len(data):
-            print(f"  [CRITICAL ERROR] Compressed payload ({ulCmpDataSize}B) extends beyond file end ({len(data)}B).")
-            parcel_ok = False
-        
-        # 2. Check compressed size vs uncompressed size consistency (Simple check)
-        if ucCompressType == 0x04 and ulCmpDataSize > usCmpDataUncompSize and usCmpDataUncompSize != 0:
-             print(f"  [WARNING] Compressed size ({ulCmpDataSize}) > Uncompressed size ({usCmpDataUncompSize}) for SZIP parcel.")
-        
-        # 3. Check padding/advancement
-        # Advance by header + compressed payload
-        offset += _PCL_HEADER_LEN + ulCmpDataSize
-        
-        # Handle padding to a block boundary (e.g., 4096 bytes)
-        padding = (offset % block_size)
-        if padding != 0:
-            pad_size = block_size - padding
-            if pad_size > 0:
-                print(f"  [INFO] Skipping {pad_size} bytes of alignment padding (to {block_size} boundary).")
-            offset += pad_size
-            
-        if not parcel_ok:
-            file_ok = False
+    while offset < n and n - offset >= _PCL_HEADER_LEN:
+        offsets.append(offset)
+        size_hi, size_lo = _PCL_SIZE_STRUCT.unpack_from(data, offset)
+        # Advance by header + compressed payload, then pad to a block boundary
+        offset += _PCL_HEADER_LEN + ((size_hi << 16) | size_lo)
+        offset += -offset % block_size
+    return np.array(offsets, dtype=np.int64), offset
+
+
+def _read_headers(data, offsets: np.ndarray) -> np.ndarray:
+    """Second pass: gathers the headers at *offsets* into one _PCL_DTYPE array."""
+    raw = np.frombuffer(data, dtype=np.uint8)
+    rows = raw[offsets[:, None] + np.arange(_PCL_HEADER_LEN)]
+    return rows.view(_PCL_DTYPE).reshape(len(offsets))
+
+
+def check_sdl_struct(filename: str, data, block_size: int = 2048, report: bool = True) -> Tuple[bool, str]:
+    """
+    Validates the structure of a single SDL file (which contains one or more parcels)
+    and returns (ok, report text) without printing anything. With report=False
+    no text is formatted and the report is empty.
+    *data* may be any buffer (bytes, bytearray, memoryview); it is never copied.
+    Headers are located first, then decoded and checked as arrays; the report
+    is built afterwards.
+    """
+    n = len(data)
+    offsets, end_offset = _parcel_offsets(data, block_size)
+    hdr = _read_headers(data, offsets)
+
+    # Combined compressed data size (ulCmpDataSize)
+    cmp_size = (hdr["usCmpDataSizeHi"].astype(np.int64) << 16) | hdr["usCmpDataSizeLo"]
+    uncomp_size = hdr["usCmpDataUncompSize"].astype(np.int64)
+    parcel_end = offsets + _PCL_HEADER_LEN + cmp_size
+
+    # Validation Logic
+    # 1. Check if compressed payload fits in file
+    overflow = parcel_end > n
+    # 2. Check compressed size vs uncompressed size consistency (Simple check)
+    szip_oversize = (hdr["ucCompressType"] == 0x04) & (cmp_size > uncomp_size) & (uncomp_size != 0)
+    # 3. Padding to a block boundary after each parcel
+    pad_size = -parcel_end % block_size
+    truncated = end_offset < n
+    file_ok = not (overflow.any() or truncated)
+    if not report:
+        return file_ok, ""
+
+    # Report: columns as Python lists and helpers bound to locals, so the
+    # per-parcel loop does no NumPy scalar indexing or global lookups; lines
+    # are collected and joined once per file
+    codes_get = COMPRESSION_CODES.get
+    pid_offset_units = parcel_offset_units(hdr["ulParcelId"])
+    out = []
+    emit = out.append
+    rows = zip(
+        offsets.tolist(), hdr["ulParcelId"].tolist(), pid_offset_units.tolist(), hdr["ucRegion"].tolist(),
+        hdr["ucParcelType"].tolist(), hdr["ucParcelDesc"].tolist(), hdr["ucCompressType"].tolist(),
+        hdr["usPayloadSize"].tolist(), cmp_size.tolist(), uncomp_size.tolist(),
+        overflow.tolist(), szip_oversize.tolist(), pad_size.tolist(),
+    )
+    for (offset, ulParcelId, offset_units, ucRegion, ucParcelType, ucParcelDesc, ucCompressType,
+         usPayloadSize, ulCmpDataSize, usCmpDataUncompSize, is_overflow, is_szip_oversize, pad) in rows:
+        emit(f"* {filename} @ {offset}: PID={ulParcelId} (OffsetUnits={offset_units})\n")
+        emit(f"  Region={ucRegion}, Type={ucParcelType}, Desc={ucParcelDesc}, Compress={codes_get(ucCompressType, f'0x{ucCompressType:02x}')}\n")
+        emit(f"  CompSize={ulCmpDataSize}, UncompSize={usCmpDataUncompSize}, PayloadSizeH={usPayloadSize}\n")
+
+        if is_overflow:
+            emit(f"  [CRITICAL ERROR] Compressed payload ({ulCmpDataSize}B) extends beyond file end ({n}B).\n")
+        if is_szip_oversize:
+            emit(f"  [WARNING] Compressed size ({ulCmpDataSize}) > Uncompressed size ({usCmpDataUncompSize}) for SZIP parcel.\n")
+        if pad:
+            emit(f"  [INFO] Skipping {pad} bytes of alignment padding (to {block_size} boundary).\n")
+
+    if truncated:
+        emit(f"  [ERROR] File end reached unexpectedly at offset {end_offset}. Remaining bytes: {n - end_offset}\n")
 
     if file_ok:
-        print(f"** {filename}: OK ({len(data)} bytes, {offset // block_size} blocks)")
+        emit(f"** {filename}: OK ({n} bytes, {end_offset // block_size} blocks)\n")
+    return file_ok, "".join(out)
+
+
+def validate_sdl_struct(filename: str, data, block_size: int = 2048) -> bool:
+    """check_sdl_struct() with the report written to stdout in one call."""
+    file_ok, report = check_sdl_struct(filename, data, block_size)
+    sys.stdout.write(report)
     return file_ok
 
 
-def main(iso_path: str) -> int:
+class _BufferWriter:
+    """Write-only file-like sink that fills a bytearray preallocated to the file size."""
+
+    def __init__(self, size: int):
+        self.buf = bytearray(size)
+        self.pos = 0
+
+    def write(self, chunk) -> int:
+        n = len(chunk)
+        self.buf[self.pos : self.pos + n] = chunk
+        self.pos += n
+        return n
+
+    def view(self) -> memoryview:
+        return memoryview(self.buf)[: self.pos]
+
+
+def _map_iso(iso_path: str) -> Optional[mmap.mmap]:
+    """Read-only mapping of the whole image, or None if it cannot be mapped."""
+    try:
+        with open(iso_path, "rb") as fh:
+            return mmap.mmap(fh.fileno(), 0, access=mmap.ACCESS_READ)
+    except (OSError, ValueError):
+        return None
+
+
+def _load_sdl(iso, iso_map: Optional[mmap.mmap], child) -> memoryview:
+    """
+    Contents of a root SDL file as a memoryview: a zero-copy slice of the
+    mapped image (pages are read only when touched), or - when the image is
+    not mapped or the extent is not inside it - a buffer filled by pycdlib.
+    """
+    start = child.extent_location() * iso.logical_block_size
+    length = child.get_data_length()
+    if iso_map is not None and start + length <= len(iso_map):
+        return memoryview(iso_map)[start : start + length]
+    sink = _BufferWriter(length)
+    iso.get_file_from_iso_fp(sink, iso_path="/" + child.file_identifier().decode("ascii", errors="ignore"))
+    return sink.view()
+
+
+def main(iso_path: str, quiet: bool = False) -> int:
+    """Validates every SDL file in the ISO root; returns the exit code. *quiet* prints nothing to stdout."""
     block_size = 4096
     
     try:
@@ -121,40 +225,65 @@ def main(iso_path: str) -> int:
         print(f"ERROR: Could not open ISO file {iso_path}: {e}", file=sys.stderr)
         return 1
 
-    root = iso.list_children(iso_path="/")
-    sdl_entries = [
-        child
-        for child in root
-        if getattr(child, "file_identifier", b"").upper().endswith(b".SDL;1")
-    ]
+    # (child, identifier) pairs; the identifier is read once per child
+    sdl_entries = []
+    for child in iso.list_children(iso_path="/"):
+        ident = child.file_identifier()
+        # Case-insensitive, but only the suffix is upper-cased, not the whole name
+        if ident[-len(_SDL_SUFFIX):].upper() == _SDL_SUFFIX:
+            sdl_entries.append((child, ident))
 
     if not sdl_entries:
-        print("No SDL files found in ISO.")
+        if not quiet:
+            print("No SDL files found in ISO.")
         iso.close()
         return 0
 
+    # ISO reads stay on this thread (one pycdlib handle); each file is checked
+    # on the pool as soon as it is read, reports are printed in ISO order.
+    iso_map = _map_iso(iso_path)
+    views: List[memoryview] = []
     ok = True
-    for child in sdl_entries:
-        name_raw = child.file_identifier.decode("ascii", errors="ignore")
-        name = name_raw.split(";")[0]
+    pending: List[Tuple[str, Optional[Future]]] = []
+    try:
+        with ThreadPoolExecutor(max_workers=os.cpu_count()) as pool:
+            for child, ident in sdl_entries:
+                name_raw = ident.decode("ascii", errors="ignore")
+                name = name_raw.split(";")[0]
+
+                if name.upper() in ("MTOC.SDL", "REGION.SDL", "REGIONS.SDL", "INIT.SDL"):
+                    pending.append((name, None))
+                    continue
 
-        buf = io.BytesIO()
-        iso.get_file_from_iso_fp(buf, iso_path=f"/{name_raw}")
-        data = buf.getvalue()
+                views.append(_load_sdl(iso, iso_map, child))
+                pending.append((name, pool.submit(check_sdl_struct, name, views[-1], block_size, not quiet)))
 
-        if name.upper() in ("MTOC.SDL", "REGION.SDL", "REGIONS.SDL", "INIT.SDL"):
-            print(f"* {name}: (skipped – special index file)")
-            continue
+            iso.close()
 
-        if not validate_sdl_struct(name, data, block_size):
-            ok = False
+            for name, future in pending:
+                if future is None:
+                    if not quiet:
+                        print(f"* {name}: (skipped – special index file)")
+                    continue
+                file_ok, report = future.result()
+                sys.stdout.write(report)
+                if not file_ok:
+                    ok = False
+    finally:
+        # The pool has drained, so no check still holds a buffer: drop the
+        # exported views, then the mapping itself can be closed.
+        for view in views:
+            view.release()
+        if iso_map is not None:
+            iso_map.close()
 
-    iso.close()
     return 0 if ok else 1
 
 
 if __name__ == "__main__":
-    if len(sys.argv) != 2:
-        print("Usage: python validate_sdal_iso.py <path_to_iso>", file=sys.stderr)
-        sys.exit(1)
-    sys.exit(main(sys.argv[1]))
\ No newline at end of file
+    parser = argparse.ArgumentParser(description="Structural validator for SDAL / PSF ISO images.")
+    parser.add_argument("iso_path", help="path to the ISO image")
+    parser.add_argument("-q", "--quiet", action="store_true",
+                        help="no per-parcel report; only the exit code tells pass/fail")
+    args = parser.parse_args()
+    sys.exit(main(args.iso_path, quiet=args.quiet))
\ No newline at end of file